@@ -2,14 +2,28 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox,simpledialog,  font as tkFont
 import xml.etree.ElementTree as ET
 import csv
+import heapq
 import threading
-from collections import Counter, deque, defaultdict
+from collections import Counter, OrderedDict, deque, defaultdict
 import traceback
 import os
+import sys
+import time
+import tracemalloc
+import weakref
+import hashlib
 import json
 import re
 from datetime import datetime
 import uuid
+import math
+import random
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, chain, compress, islice
+from operator import attrgetter, ne
 from lxml import etree
 # from tkinter import
 
@@ -19,8 +33,1365 @@ CHUNK_SIZE = 1024 * 1024
 MIN_ROWS_FOR_TABLE = 3
 MIN_PERCENT_SIMILAR = 0.6
 UNDO_STACK_SIZE = 20
-VIRTUAL_TABLE_ROW_COUNT = 100  # Number of rows to display at once
+VIRTUAL_TABLE_ROW_COUNT = 100  # Number of rows to display at once until the table view knows its height
+WHEEL_SCROLL_ROWS = 3  # Rows scrolled per mouse-wheel notch in virtual tables
+SCROLL_REPAINT_DELAY_MS = 16  # Scroll events arriving within this window share one repaint
+COLUMN_MIN_WIDTH = 50  # Auto-sized column width limits, in pixels
+COLUMN_MAX_WIDTH = 500
+COLUMN_WIDTH_PADDING = 20
+COLUMN_WIDTH_SAMPLE_ROWS = 200  # Rows, spread evenly over the whole table, measured when auto-sizing columns
+TEXT_WIDTH_EXACT_CHARS = 40  # Longer text is width-estimated from character classes instead of measured
+TEXT_WIDTH_CACHE_SIZE = 50000  # Measured strings remembered per font
+LARGE_XML_FILE_SIZE = 256 * 1024 * 1024  # Offer streaming mode for XML files larger than this
+STREAM_PROGRESS_INTERVAL = 200000  # Elements processed between progress updates in streaming mode
+STREAM_ROW_BATCH_ROWS = 2048  # Rows a parent buffers as dicts in streaming mode before moving them into column storage
+TABLE_BATCH_ROWS = 50000  # Rows encoded into column storage per batch when loading a table
+DICTIONARY_MIN_SIZE = 4096  # Distinct values a text column may always dictionary-encode
+DICTIONARY_MAX_RATIO = 0.5  # Above this distinct/total ratio a text column is stored as a plain list
+QUICK_FILTER_DEBOUNCE_MS = 150  # Quiet period after the last keystroke before the quick filter runs
+QUICK_FILTER_THREAD_ROWS = 1000000  # Quick filter scans at least this many rows on a worker thread
+SORT_TYPE_SAMPLE_SIZE = 1000  # Distinct values sampled to decide whether a text column sorts as numbers/dates
+SORT_TYPE_MIN_RATIO = 0.9  # Share of the sample that must parse for that sort type to be used
+SORT_INDEX_MIN_EDITS = 256  # A column's sort index absorbs at least this many edits before being rebuilt
+SORT_INDEX_EDIT_DIVISOR = 1024  # ... or one edit per this many rows, whichever is more
+SORT_INDEX_MAX_SHIFTS = 4  # Row inserts/deletes a sort index absorbs before being rebuilt; each renumbers every entry
+JOIN_MEMORY_BUDGET_MB = 512  # Default memory for a join's hash index before it spills partitions to disk
+JOIN_INDEX_ENTRY_BYTES = 120  # Rough cost of one hash index entry (key, list slot, row number)
+JOIN_MAX_SPILL_PARTITIONS = 256
+HYPERLOGLOG_PRECISION = 12  # APPROX_COUNT_DISTINCT: 2**12 registers per group (about 1.6% error)
+HYPERLOGLOG_EXACT_LIMIT = 1024  # Distinct values counted exactly per group before switching to registers
+KLL_SKETCH_SIZE = 200  # APPROX_MEDIAN/APPROX_P95: compactor size k (rank error around 1/k)
+SPACE_SAVING_COUNTERS = 64  # APPROX_MODE: values tracked per group
+QUERY_SELECTIVITY_SAMPLE = 256  # Rows sampled per table to order AND/OR conditions by how often they pass
+QUERY_PUBLISH_INTERVAL_MS = 100  # How often rows from a running query are shown in the results grid
+QUERY_CANCEL_CHECK_ROWS = 16384  # Source rows a query scans between checks of its Cancel button
+QUERY_EXPORT_BUFFER_BYTES = 1024 * 1024  # Write buffer of Query > Export Query to CSV/JSONL
+QUERY_EXPORT_BATCH_ROWS = 4096  # Rows handed to the CSV writer at once while exporting a query
+QUERY_CACHE_BUDGET_MB = 256  # Memory for finished query results kept so unchanged re-runs show at once
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%m/%d/%Y", "%d-%b-%y")
+
+
+def find_table_row_tag(tag_counts):
+    """Returns the repeating child tag if a parent's child tag counts look like a table, otherwise None."""
+    if not tag_counts:
+        return None
+    row_tag, count = tag_counts.most_common(1)[0]
+    if count >= MIN_ROWS_FOR_TABLE and count / sum(tag_counts.values()) >= MIN_PERCENT_SIMILAR:
+        return row_tag
+    return None
+
+
+_attribute_column_names = {}
+
+
+def attribute_column(name):
+    """Table column name for an XML attribute ('@' + name), shared by every row that carries the attribute."""
+    column = _attribute_column_names.get(name)
+    if column is None:
+        column = _attribute_column_names[name] = "@" + name
+    return column
+
+
+_element_tag = attrgetter("tag")
+_element_attrib = attrgetter("attrib")
+
+
+def find_table_candidates(root):
+    """Returns (parent_element, row_tag, sorted columns) for each element whose children look like table rows."""
+    candidates = []
+    for parent_element in root.iter():
+        child_count = len(parent_element)
+        if child_count < MIN_ROWS_FOR_TABLE:
+            continue
+        child_tags = set(map(_element_tag, parent_element))
+        if len(child_tags) == child_count:
+            continue  # No repeated child tag, as in most row elements themselves
+        if len(child_tags) == 1:
+            row_tag = next(iter(child_tags))
+            rows = parent_element
+        else:
+            row_tag = find_table_row_tag(Counter(map(_element_tag, parent_element)))
+            if row_tag is None:
+                continue
+            rows = [child for child in parent_element if child.tag == row_tag]
+        # Columns come from every row, so a tag or attribute that only appears in late rows is still queryable.
+        column_headers = set(map(_element_tag, chain.from_iterable(rows)))
+        column_headers.update(map(attribute_column, set(chain.from_iterable(map(_element_attrib, rows)))))
+        if column_headers:
+            candidates.append((parent_element, row_tag, sorted(column_headers)))
+    return candidates
+
+
+_NAN = float('nan')
+_MISSING = object()
+_NUMBER_CHARS = frozenset("0123456789.-+e")
+_SEARCH_SEPARATOR = "\x00"
+# Formats whose text already sorts chronologically, so they can be checked with a regex instead of parsed
+_ISO_DATE_PATTERNS = {
+    "%Y-%m-%d %H:%M:%S": re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}"),
+    "%Y-%m-%d": re.compile(r"\d{4}-\d{2}-\d{2}"),
+}
+
+
+def parse_date(text, formats=DATE_FORMATS):
+    """Returns text as a datetime using the first format that fits, or None."""
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def detect_sort_type(sample):
+    """Returns (sort type, date format or None) for a sample of a column's non-empty values."""
+    if not sample:
+        return 'string', None
+    needed = len(sample) * SORT_TYPE_MIN_RATIO
+    numbers = []
+    for value in sample:
+        try:
+            number = float(value)
+        except ValueError:
+            continue
+        if math.isfinite(number):
+            numbers.append(number)
+    if len(numbers) >= needed:
+        return ('int' if all(number.is_integer() for number in numbers) else 'float'), None
+    for fmt in DATE_FORMATS:
+        if sum(1 for value in sample if parse_date(value, (fmt,))) >= needed:
+            return 'date', fmt
+    return 'string', None
+
+
+def _sort_key_function(sort_type, date_format):
+    """Key for a non-empty text value. Values that do not fit sort_type come after those that do, as text."""
+    if sort_type in ('int', 'float'):
+        def key(value):
+            try:
+                number = float(value)
+            except ValueError:
+                return 1, value.lower()
+            return (0, number) if math.isfinite(number) else (1, value.lower())
+    elif sort_type == 'date' and date_format in _ISO_DATE_PATTERNS:
+        pattern = _ISO_DATE_PATTERNS[date_format]
+
+        def key(value):
+            return (0, value) if pattern.fullmatch(value) else (1, value.lower())
+    elif sort_type == 'date':
+        def key(value):
+            try:
+                return 0, datetime.strptime(value, date_format)
+            except ValueError:
+                return 1, value.lower()
+    else:
+        return str.lower
+    return key
+
+
+def _number_to_text(number):
+    if number != number:
+        return ""
+    if number.is_integer() and abs(number) < 1e15:
+        return str(int(number))
+    return repr(number)
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return _NAN
+
+
+def _text_to_number(value):
+    """Returns value as a float if it converts back to exactly the same text, otherwise None."""
+    if value == "":
+        return _NAN
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return None
+    if not math.isfinite(number) or _number_to_text(number) != value:
+        return None
+    return number
+
+
+class TableColumn:
+    """
+    One column of a ColumnarTable, stored as numbers, dictionary codes or plain text, whichever fits its values.
+    """
+    __slots__ = ("kind", "_data", "_dictionary", "_codes_by_value", "_lower_dictionary", "_search_blob",
+                 "_sort_type", "_text_sort_key", "_ranks", "_order", "_order_kind", "_order_edits",
+                 "_order_shifts", "_sort_type_unsure")
+
+    def __init__(self):
+        self.kind = 'num'
+        self._data = array('d')
+        self._dictionary = None
+        self._codes_by_value = None
+        self._lower_dictionary = None  # Lowercase copy of the dictionary, kept in step with it
+        self._search_blob = None  # (lowercase values joined by _SEARCH_SEPARATOR, row start offsets)
+        self._sort_type = None  # (sort type, date format), decided when ranks are first built
+        self._text_sort_key = None
+        self._ranks = None  # (ranks array, rank count) from sort_ranks()
+        self._order = None  # Persistent sorted permutation from sort_order()
+        self._order_kind = None
+        self._order_edits = 0
+        self._order_shifts = 0
+        self._sort_type_unsure = False  # Edits since the sort index was built may have changed the detected sort type
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, index):
+        if self.kind == 'num':
+            return _number_to_text(self._data[index])
+        if self.kind == 'dict':
+            return self._dictionary[self._data[index]]
+        return self._data[index]
+
+    def values(self):
+        if self.kind == 'num':
+            return [_number_to_text(number) for number in self._data]
+        if self.kind == 'dict':
+            dictionary = self._dictionary
+            return [dictionary[code] for code in self._data]
+        return list(self._data)
+
+    def values_as_numbers(self):
+        """Values of a 'num' column as floats (NaN for empty)."""
+        return self._data.tolist()
+
+    def append(self, value):
+        encoded = self._encode(value)
+        self._data.append(encoded)
+        self._changed(len(self._data) - 1)
+
+    def extend(self, values):
+        for value in values:
+            encoded = self._encode(value)
+            self._data.append(encoded)
+        self._search_blob = None
+        self._discard_sort_cache()
+
+    def set(self, index, value):
+        self._remove_from_order(index)
+        encoded = self._encode(value)
+        self._data[index] = encoded
+        self._changed(index)
+
+    def insert(self, index, value):
+        encoded = self._encode(value)
+        self._data.insert(index, encoded)
+        self._shift_order(index, 1)
+        self._changed(index)
+
+    def pop(self, index):
+        value = self.get(index)
+        self._remove_from_order(index)
+        self._data.pop(index)
+        self._shift_order(index + 1, -1)
+        self._search_blob = None
+        self._ranks = None
+        if self._order is None:
+            self._sort_type = None
+        return value
+
+    def _changed(self, index):
+        """Drops derived data after row index got a new value and re-files that row in the sort index."""
+        self._search_blob = None
+        self._ranks = None
+        if self._order is None:
+            self._sort_type = None
+        else:
+            if self.kind != self._order_kind and 'num' in (self.kind, self._order_kind):
+                self._discard_sort_cache()  # Left 'num' storage, so rows now need the text sort key
+            else:
+                if self.kind != 'num' and not self._fits_sort_type(self.get(index)):
+                    self._sort_type_unsure = True
+                self._order.insert(self._order_position(index), index)
+
+    def _fits_sort_type(self, value):
+        """Whether a new text value parses as the cached sort type (for 'string', as no other type)."""
+        if not value:
+            return True
+        if self._sort_type[0] == 'string':
+            return detect_sort_type([value])[0] == 'string'
+        return self._text_sort_key(value)[0] == 0
+
+    def _remove_from_order(self, index):
+        if self._order is None:
+            return
+        self._order_edits += 1
+        self._sort_type_unsure = True  # The removed value may have been what kept the detected sort type
+        if self._order_edits > max(SORT_INDEX_MIN_EDITS, len(self._data) // SORT_INDEX_EDIT_DIVISOR):
+            self._discard_sort_cache()  # Large batch edits: rebuilding once is cheaper than shifting the index each time
+            return
+        del self._order[self._order_position(index)]
+
+    def _shift_order(self, first_row, step):
+        """Renumbers rows from first_row on by step in the sort index after a row insert or delete."""
+        if self._order is None:
+            return
+        self._order_shifts += 1
+        if self._order_shifts > SORT_INDEX_MAX_SHIFTS:
+            self._discard_sort_cache()
+            return
+        self._order = array('I', [row + step if row >= first_row else row for row in self._order])
+
+    def _order_position(self, row):
+        """Where row's (typed key, row) falls in the sort index; bisect only takes a key function from Python 3.10."""
+        key, order, low, high = self._row_sort_key(row), self._order, 0, len(self._order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._row_sort_key(order[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _discard_sort_cache(self):
+        self._sort_type = None
+        self._ranks = None
+        self._order = None
+        self._sort_type_unsure = False
+
+    def _check_sort_type(self):
+        """Drops the sort cache if the values the column now holds would be detected as another sort type."""
+        self._sort_type_unsure = False
+        if self.kind == 'num' or self._sort_type is None:
+            return
+        detected = self._detect_sort_type(self._distinct_text_values())
+        if detected != self._sort_type and not {detected[0], self._sort_type[0]} <= {'int', 'float'}:
+            self._discard_sort_cache()
+
+    def _distinct_text_values(self):
+        """Distinct non-empty values of a text column. The dictionary can still hold values no row uses."""
+        if self.kind == 'dict':
+            dictionary = self._dictionary
+            return [dictionary[code] for code in sorted(set(self._data)) if dictionary[code]]
+        distinct = set(self._data)
+        distinct.discard("")
+        return list(distinct)
+
+    @staticmethod
+    def _detect_sort_type(non_empty):
+        step = max(1, len(non_empty) // SORT_TYPE_SAMPLE_SIZE)
+        return detect_sort_type(non_empty[::step])
+
+    def _row_sort_key(self, row):
+        """(typed key, row) for one row, matching the order sort_order() keeps rows in."""
+        if self.kind == 'num':
+            number = self._data[row]
+            return (-math.inf if number != number else number), row
+        value = self.get(row)
+        if not value:
+            return (-1,), row
+        return (0, self._text_sort_key(value)), row
+
+    def sort_ranks(self):
+        """Returns (sort type, ranks, rank count); equal values share a rank and empty cells rank first."""
+        if self._sort_type_unsure:
+            self._check_sort_type()
+        if self._ranks is None:
+            self._ranks = self._build_sort_ranks()
+        return self._sort_type[0], self._ranks[0], self._ranks[1]
+
+    def sort_order(self):
+        """Returns the rows in sorted order as an array, kept up to date through later edits."""
+        if self._sort_type_unsure:
+            self._check_sort_type()
+        if self._order is None:
+            _, ranks, _ = self.sort_ranks()
+            self._order = array('I', sorted(range(len(self._data)), key=ranks.__getitem__))
+            self._order_kind = self.kind
+            self._order_edits = 0
+            self._order_shifts = 0
+        return self._order
+
+    def _build_sort_ranks(self):
+        if self.kind == 'num':
+            keys = [-math.inf if number != number else number for number in self._data]
+            distinct = sorted(set(keys))
+            rank_of = {number: rank for rank, number in enumerate(distinct)}
+            if self._sort_type is None:
+                is_integral = all(number.is_integer() for number in distinct if math.isfinite(number))
+                self._sort_type = ('int' if is_integral else 'float'), None
+            return array('I', map(rank_of.__getitem__, keys)), len(distinct)
+
+        # Text columns: rank each distinct value once, then map rows through the result.
+        non_empty = self._distinct_text_values()
+        if self._sort_type is None:
+            self._sort_type = self._detect_sort_type(non_empty)
+            self._text_sort_key = _sort_key_function(*self._sort_type)
+        key = self._text_sort_key
+
+        ordered = sorted(non_empty, key=key)
+        ordered_keys = list(map(key, ordered))
+        # Dense ranks from 1: the rank goes up wherever a key differs from the one before it.
+        ranks = list(accumulate(map(ne, ordered_keys, chain((_MISSING,), ordered_keys))))
+        rank_of = dict(zip(ordered, ranks))
+        rank_of[""] = 0
+        rank_count = (ranks[-1] if ranks else 0) + 1
+        if self.kind == 'dict':
+            code_ranks = [rank_of.get(value, 0) for value in self._dictionary]
+            return array('I', map(code_ranks.__getitem__, self._data)), rank_count
+        return array('I', map(rank_of.__getitem__, self._data)), rank_count
+
+    def mark_matches(self, text, mask, indices=None):
+        """Sets mask[i] for rows whose value contains the lowercase text; rows outside indices may be marked too."""
+        if self.kind == 'dict':
+            if self._lower_dictionary is None:
+                self._lower_dictionary = [value.lower() for value in self._dictionary]
+            hit_codes = {code for code, value in enumerate(self._lower_dictionary) if text in value}
+            if hit_codes:
+                codes = self._data
+                if indices is None:
+                    for i, code in enumerate(codes):
+                        if code in hit_codes:
+                            mask[i] = 1
+                else:
+                    for i in indices:
+                        if codes[i] in hit_codes:
+                            mask[i] = 1
+            return
+        if self.kind == 'num' and not _NUMBER_CHARS.issuperset(text):
+            return
+        if _SEARCH_SEPARATOR in text:
+            for i, value in enumerate(self.values()):
+                if text in value.lower():
+                    mask[i] = 1
+            return
+
+        # One C-level find() pass over the joined column; Python only runs once per matching row.
+        if self._search_blob is None:
+            lower_values = [value.lower() for value in self.values()]
+            starts = array('q', [0])
+            starts.extend(accumulate(len(value) + 1 for value in lower_values))
+            self._search_blob = (_SEARCH_SEPARATOR.join(lower_values), starts)
+        blob, starts = self._search_blob
+        position = blob.find(text)
+        while position != -1:
+            row = bisect_right(starts, position) - 1
+            mask[row] = 1
+            position = blob.find(text, starts[row + 1])
+
+    def discard_search_cache(self):
+        self._lower_dictionary = None
+        self._search_blob = None
+
+    def _encode(self, value):
+        if self.kind == 'num':
+            number = _text_to_number(value)
+            if number is not None:
+                return number
+            self._convert_to_dictionary()
+        if self.kind == 'dict':
+            code = self._codes_by_value.get(value)
+            if code is not None:
+                return code
+            if len(self._dictionary) < max(DICTIONARY_MIN_SIZE, len(self._data) * DICTIONARY_MAX_RATIO):
+                code = len(self._dictionary)
+                self._dictionary.append(value)
+                self._codes_by_value[value] = code
+                if self._lower_dictionary is not None:
+                    self._lower_dictionary.append(value.lower())
+                return code
+            self._convert_to_list()
+        return value
+
+    def _convert_to_dictionary(self):
+        texts = [_number_to_text(number) for number in self._data]
+        self.kind = 'dict'
+        self._data = array('I')
+        self._dictionary = []
+        self._codes_by_value = {}
+        for text in texts:
+            encoded = self._encode(text)
+            self._data.append(encoded)
+
+    def _convert_to_list(self):
+        dictionary = self._dictionary
+        self._data = [dictionary[code] for code in self._data]
+        self.kind = 'str'
+        self._dictionary = None
+        self._codes_by_value = None
+        self._lower_dictionary = None
+
+
+class TableRow:
+    """
+    A dict-like view of one ColumnarTable row, including the "_element" and "_original_index" keys.
+    """
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def get(self, key, default=None):
+        return self.table.get_value(self.index, key, default)
+
+    def __getitem__(self, key):
+        value = self.table.get_value(self.index, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.table.set_value(self.index, key, value)
+
+    def __contains__(self, key):
+        return self.table.get_value(self.index, key, _MISSING) is not _MISSING
+
+    def keys(self):
+        return list(self.table.columns)
+
+    def values(self):
+        return [self.table.get_value(self.index, column) for column in self.table.columns]
+
+    def items(self):
+        return [(column, self.table.get_value(self.index, column)) for column in self.table.columns]
+
+
+class ColumnarTable:
+    """
+    Column-oriented storage for a table's rows; indexing and iteration yield TableRow views.
+    """
+
+    def __init__(self, columns=(), with_elements=False):
+        self.columns = []
+        self._columns = {}
+        self._elements = [] if with_elements else None
+        self._row_count = 0
+        self.version = 0  # Bumped on every change so derived views (filters, indexes) can tell they are stale
+        self._value_lists = {}  # column -> stripped text per row, see column_values()
+        self._value_lists_version = 0
+        for column in columns:
+            self.add_column(column)
+
+    def __len__(self):
+        return self._row_count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._row_count
+        if not 0 <= index < self._row_count:
+            raise IndexError("table row index out of range")
+        return TableRow(self, index)
+
+    def __iter__(self):
+        return (TableRow(self, i) for i in range(self._row_count))
+
+    def add_column(self, column):
+        if column in self._columns:
+            return
+        table_column = TableColumn()
+        table_column.extend([""] * self._row_count)
+        self.columns.append(column)
+        self._columns[column] = table_column
+        self.version += 1
+
+    def column(self, column):
+        return self._columns.get(column)
+
+    def append_row(self, row_values, element=None):
+        """Appends one row given as a dict (unknown keys become new columns) or as a sequence of column values."""
+        if isinstance(row_values, dict):
+            for column in row_values:
+                if column not in self._columns:
+                    self.add_column(column)
+            for column, table_column in self._columns.items():
+                table_column.append(row_values.get(column, ""))
+        else:
+            width = len(row_values)
+            for i, table_column in enumerate(self._columns.values()):
+                table_column.append(row_values[i] if i < width else "")
+        if self._elements is not None:
+            self._elements.append(element)
+        self._row_count += 1
+        self.version += 1
+
+    def extend_rows(self, rows, elements=None):
+        """Appends a batch of value sequences, encoding the batch one column at a time."""
+        width = len(self.columns)
+        padded_rows = [row if len(row) == width else (list(row) + [""] * width)[:width] for row in rows]
+        for column_values, table_column in zip(zip(*padded_rows), self._columns.values()):
+            table_column.extend(column_values)
+        if self._elements is not None:
+            self._elements.extend(elements if elements is not None else [None] * len(padded_rows))
+        self._row_count += len(padded_rows)
+        self.version += 1
+
+    def append_table(self, other):
+        """Appends every row of another ColumnarTable, adding the columns this one lacks."""
+        for column in other.columns:
+            self.add_column(column)
+        empty = [""] * len(other)
+        self.extend_rows(list(zip(*[other._columns[column].values() if column in other._columns else empty
+                                    for column in self.columns])))
+
+    def find_rows(self, text, candidate_indices=None, is_cancelled=None):
+        """Returns the indices of rows where any column contains text, or None if cancelled part way."""
+        text = text.lower()
+        if not text:
+            return list(range(self._row_count)) if candidate_indices is None else list(candidate_indices)
+        mask = bytearray(self._row_count)
+        for table_column in self._columns.values():
+            if is_cancelled and is_cancelled():
+                return None
+            table_column.mark_matches(text, mask, candidate_indices)
+        if candidate_indices is None:
+            return list(compress(range(self._row_count), mask))
+        return [i for i in candidate_indices if mask[i]]
+
+    def sort_rows(self, row_indices, criteria):
+        """Sorts row_indices in place by criteria, a list of (column, 'asc' | 'desc'); ties keep their order."""
+        criteria = [(self._columns[column], direction) for column, direction in criteria if column in self._columns]
+        if not criteria:
+            return
+        if len(criteria) == 1:
+            # Read the column's persistent sort index instead of sorting: O(n) per click.
+            table_column, direction = criteria[0]
+            order = table_column.sort_order()
+            if len(row_indices) == self._row_count:
+                row_indices[:] = order
+            else:
+                in_view = bytearray(self._row_count)
+                for i in row_indices:
+                    in_view[i] = 1
+                row_indices[:] = compress(order, map(in_view.__getitem__, order))
+            if direction == 'desc':
+                row_indices.reverse()
+            return
+
+        # Keys are built per table row when the view covers most of the table, otherwise per view position.
+        per_row = len(row_indices) * 2 > self._row_count
+        keys = None
+        for table_column, direction in criteria:
+            _, ranks, rank_count = table_column.sort_ranks()
+            column_keys = ranks if per_row else list(map(ranks.__getitem__, row_indices))
+            if direction == 'desc':
+                column_keys = [rank_count - 1 - rank for rank in column_keys]
+            keys = column_keys if keys is None else [key * rank_count + rank for key, rank in zip(keys, column_keys)]
+        if per_row:
+            row_indices.sort(key=keys.__getitem__)
+        else:
+            order = sorted(range(len(row_indices)), key=keys.__getitem__)
+            row_indices[:] = [row_indices[position] for position in order]
+
+    def discard_search_cache(self):
+        for table_column in self._columns.values():
+            table_column.discard_search_cache()
+
+    def column_values(self, column, form="text"):
+        """Returns column's value per row as "text", "lower", "number" or "order" keys, cached per table version."""
+        if self._value_lists_version != self.version:
+            self._value_lists = {}
+            self._value_lists_version = self.version
+        values = self._value_lists.get((column, form))
+        if values is None:
+            table_column = self._columns.get(column)
+            if form == "lower":
+                values = [value.lower() for value in self.column_values(column)]
+            elif form == "order":
+                if table_column is None:
+                    values = [0] * self._row_count
+                elif table_column.kind == 'num':
+                    # Same order as the column's ranks without sorting the column to build them.
+                    values = [-math.inf if number != number else number for number in table_column.values_as_numbers()]
+                else:
+                    values = table_column.sort_ranks()[1]
+            elif form == "number":
+                if table_column is not None and table_column.kind == 'num':
+                    values = table_column.values_as_numbers()
+                else:
+                    values = list(map(_parse_float, self.column_values(column)))
+            elif table_column is None:
+                values = [""] * self._row_count
+            else:
+                values = [value.strip() for value in table_column.values()]
+            self._value_lists[(column, form)] = values
+        return values
+
+    def hash_index(self, columns, build=True):
+        """Maps each join key of columns to its rows, cached per table version; build=False only returns a built one."""
+        if self._value_lists_version != self.version:
+            self._value_lists = {}
+            self._value_lists_version = self.version
+        cache_key = (tuple(columns), "index")
+        index = self._value_lists.get(cache_key)
+        if index is None and build:
+            index = defaultdict(list)
+            if len(columns) == 1:
+                join_keys = self.column_values(columns[0])
+            else:
+                join_keys = zip(*[self.column_values(column) for column in columns])
+            for row, join_key in enumerate(join_keys):
+                index[join_key].append(row)
+            index.default_factory = None
+            self._value_lists[cache_key] = index
+        return index
+
+    def get_value(self, index, column, default=""):
+        table_column = self._columns.get(column)
+        if table_column is not None:
+            return table_column.get(index)
+        if column == "_original_index":
+            return index
+        if column == "_element":
+            return self._elements[index] if self._elements is not None else None
+        return default
+
+    def set_value(self, index, column, value):
+        if column not in self._columns:
+            self.add_column(column)
+        self._columns[column].set(index, value)
+        self.version += 1
+
+    def pop(self, index):
+        """Removes a row and returns it as a plain dict that insert() accepts back (used by undo)."""
+        row_data = {column: table_column.pop(index) for column, table_column in self._columns.items()}
+        row_data["_element"] = self._elements.pop(index) if self._elements is not None else None
+        self._row_count -= 1
+        self.version += 1
+        return row_data
+
+    def insert(self, index, row_data):
+        for column, table_column in self._columns.items():
+            table_column.insert(index, row_data.get(column, ""))
+        if self._elements is not None:
+            self._elements.insert(index, row_data.get("_element"))
+        self._row_count += 1
+        self.version += 1
+
+
+def materialize_table(parent_element, row_tag, columns):
+    """Builds the ColumnarTable for the row_tag children of parent_element; a column's first matching child wins."""
+    table = ColumnarTable(columns, with_elements=True)
+    positions = {column: i for i, column in enumerate(columns) if not column.startswith("@")}
+    attribute_positions = [(i, column[1:]) for i, column in enumerate(columns) if column.startswith("@")]
+    width = len(columns)
+    batch, batch_elements = [], []
+    for row_element in parent_element.iterfind(row_tag):
+        row_values = [""] * width
+        for child in reversed(row_element):  # Reversed so the first matching child is written last
+            position = positions.get(child.tag)
+            if position is not None:
+                row_values[position] = child.text.strip() if child.text else ""
+        attributes = row_element.attrib
+        if attributes:
+            for position, name in attribute_positions:
+                value = attributes.get(name)
+                if value is not None:
+                    row_values[position] = value.strip()
+        batch.append(row_values)
+        batch_elements.append(row_element)
+        if len(batch) >= TABLE_BATCH_ROWS:
+            table.extend_rows(batch, batch_elements)
+            batch, batch_elements = [], []
+    table.extend_rows(batch, batch_elements)
+    return table
+
+
+class JoinResultRows:
+    """
+    Join results kept as row numbers per table alias and built into dicts only when read.
+    """
+
+    def __init__(self, sources):
+        # sources: (alias, table, columns) for T1, T2, ... in order
+        self._outputs = [[(f"{alias}: {column}", table.column_values(column)) for column in columns]
+                         for alias, table, columns in sources]
+        self._rows = [array('q') for _ in sources]  # -1 where an outer or anti join found no row
+        self._match_counts = array('I')
+
+    def append(self, rows, match_count):
+        for row_array, row in zip(self._rows, rows):
+            row_array.append(-1 if row is None else row)
+        self._match_counts.append(match_count)
+
+    def __len__(self):
+        return len(self._match_counts)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        result_row = {"Match_Count": self._match_counts[position]}
+        for row_array, output in zip(self._rows, self._outputs):
+            row = row_array[position]
+            if row < 0:
+                result_row.update({name: "" for name, _ in output})
+            else:
+                result_row.update({name: values[row] for name, values in output})
+        return result_row
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def column_values(self, name):
+        """Every result row's value for one output column, read without building the row dicts."""
+        if name == "Match_Count":
+            return self._match_counts.tolist()
+        for row_array, output in zip(self._rows, self._outputs):
+            for output_name, values in output:
+                if output_name == name:
+                    return [values[row] if row >= 0 else "" for row in row_array]
+        return [None] * len(self)
+
+    def memory_size(self):
+        """Bytes held by the row number arrays (the column values are shared with the joined tables)."""
+        return sum(len(row_array) * row_array.itemsize for row_array in self._rows) + \
+            len(self._match_counts) * self._match_counts.itemsize
+
+
+def result_sort_ranks(values):
+    """Sort ranks for a list of query result values, ordered the way a table column holding them sorts."""
+    ranking_column = TableColumn()
+    ranking_column.extend(value if isinstance(value, str) else "" if value is None else _number_to_text(float(value))
+                          for value in values)
+    return ranking_column.sort_ranks()[1]
+
+
+def normalized_condition_tree(tree):
+    """A condition tree with nested same-kind AND/OR groups merged and one-condition groups unwrapped."""
+    if not tree or 'group' not in tree:
+        return tree or None
+    group = tree['group']
+    conditions = []
+    for condition in tree['conditions']:
+        condition = normalized_condition_tree(condition)
+        if condition is None:
+            continue
+        if group != 'NOT' and condition.get('group') == group:
+            conditions.extend(condition['conditions'])
+        else:
+            conditions.append(condition)
+    if not conditions:
+        return None
+    if group != 'NOT' and len(conditions) == 1:
+        return conditions[0]
+    return {'group': group, 'conditions': conditions}
+
+
+def estimate_result_bytes(results):
+    """Rough memory held by a query result: a JoinResultRows' arrays, or a list of row dicts measured by sample."""
+    if isinstance(results, JoinResultRows):
+        return results.memory_size()
+    if not results:
+        return sys.getsizeof(results)
+    sample = [results[i] for i in percentile_positions(len(results))]
+    row_bytes = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+                    for row in sample) / len(sample)
+    return sys.getsizeof(results) + int(row_bytes * len(results))
+
+
+class QueryResultCache:
+    """
+    LRU cache of finished query results, valid while every table they read keeps the same version.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()  # fingerprint -> (table snapshots, output fields, results, size)
+
+    @staticmethod
+    def table_snapshots(tables):
+        # Weak references, so a cached entry never keeps a closed file's tables alive.
+        return [(weakref.ref(table), table.version) for table in tables]
+
+    @staticmethod
+    def _is_current(snapshots, tables=None):
+        for i, (table_ref, version) in enumerate(snapshots):
+            table = table_ref()
+            if table is None or table.version != version or (tables is not None and tables[i] is not table):
+                return False
+        return tables is None or len(tables) == len(snapshots)
+
+    def get(self, fingerprint, tables):
+        """Returns (output fields, results) cached for the query on these tables, or None."""
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            return None
+        if not self._is_current(entry[0], tables):
+            self._discard(fingerprint)
+            return None
+        self._entries.move_to_end(fingerprint)
+        return entry[1], entry[2]
+
+    def put(self, fingerprint, snapshots, output_fields, results):
+        """Caches a finished query's results, taken from the tables in snapshots (see table_snapshots)."""
+        self._discard(fingerprint)
+        if not self._is_current(snapshots):
+            return  # A table changed while the query ran, so the results may mix both versions
+        for stale in [key for key, entry in self._entries.items() if not self._is_current(entry[0])]:
+            self._discard(stale)
+        size = estimate_result_bytes(results)
+        if size > self.budget_bytes:
+            return
+        self._entries[fingerprint] = (snapshots, tuple(output_fields), results, size)
+        self.used_bytes += size
+        while self.used_bytes > self.budget_bytes:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, fingerprint):
+        entry = self._entries.pop(fingerprint, None)
+        if entry is not None:
+            self.used_bytes -= entry[3]
+
+    def clear(self):
+        self._entries.clear()
+        self.used_bytes = 0
+
+
+class PlanOperator:
+    """
+    One step of a QueryPlan; under EXPLAIN ANALYZE measure() records its rows, time and peak memory.
+    """
+
+    def __init__(self, name, detail="", inputs=(), estimated_rows=None, notes=(), source=None):
+        self.name = name
+        self.detail = detail
+        self.inputs = list(inputs)
+        self.estimated_rows = estimated_rows
+        self.notes = list(notes)
+        self.source = source  # Table alias a scan reads, whose rows QueryPlan.scanned_rows counts
+        self.rows = None  # Rows produced, once the step has run under ANALYZE
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+    def measure(self, rows):
+        self.rows = 0
+        iterator = iter(rows)
+        clock = time.perf_counter
+        tracing = tracemalloc.is_tracing()
+        base_bytes = tracemalloc.get_traced_memory()[0]
+        while True:
+            start = clock()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                self.seconds += clock() - start
+                return
+            self.seconds += clock() - start
+            if tracing:
+                self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[0] - base_bytes)
+            self.rows += 1
+            yield row
 
+    def subtree_peak_bytes(self):
+        return max([self.peak_bytes] + [step.subtree_peak_bytes() for step in self.inputs])
+
+
+class QueryPlan:
+    """
+    The operators a Query Designer query runs, from its output down to the table scans.
+    """
+
+    def __init__(self, query_text="", analyze=False, trace_memory=True):
+        self.query_text = query_text
+        self.analyze = analyze
+        self.trace_memory = trace_memory  # tracemalloc slows every allocation several times over
+        self.root = None
+        self.scanned_rows = Counter()
+        self.result_rows = 0
+        self.seconds = None
+        self.peak_bytes = 0
+        self.cancelled = False
+
+    def add(self, name, detail="", estimated_rows=None, notes=(), inputs=None, source=None):
+        """Puts a new operator on top of the plan, reading inputs (by default, the current top operator)."""
+        if inputs is None:
+            inputs = [self.root] if self.root is not None else []
+        self.root = PlanOperator(name, detail, inputs, estimated_rows, notes, source)
+        return self.root
+
+    def run(self, items):
+        start = time.perf_counter()
+        base_bytes = tracemalloc.get_traced_memory()[0]
+        try:
+            for _ in items:
+                self.result_rows += 1
+        finally:
+            self.seconds = time.perf_counter() - start
+            if self.trace_memory:
+                self.peak_bytes = max(self.root.subtree_peak_bytes(),
+                                      tracemalloc.get_traced_memory()[1] - base_bytes)
+
+    def lines(self):
+        lines = ["EXPLAIN ANALYZE" if self.analyze else "EXPLAIN"]
+        if self.query_text:
+            lines += [f"  {line}" for line in self.query_text.strip().splitlines()]
+        lines.append("")
+        self._describe(self.root, 0, lines)
+        if self.analyze and self.seconds is not None:
+            outcome = "Cancelled after" if self.cancelled else "Returned"
+            summary = f"{outcome} {self.result_rows:,} rows in {self.seconds * 1000:,.1f} ms"
+            lines += ["", summary + (f"; peak memory {self.peak_bytes / 1048576:,.1f} MB." if self.trace_memory
+                                     else "."), "Times include each operator's inputs."]
+            if self.trace_memory:
+                lines.append("Memory is Python memory traced above the start of each operator, sampled as rows "
+                             "pass it. Tracing slows allocation-heavy steps; untick Trace Memory for true times.")
+        return lines
+
+    def _describe(self, step, depth, lines):
+        indent = "   " * depth
+        text = f"{indent}-> {step.name}" + (f": {step.detail}" if step.detail else "")
+        figures = []
+        if step.estimated_rows is not None:
+            figures.append(f"est. {round(step.estimated_rows):,} rows")
+        if self.analyze and step.source:
+            figures.append(f"actual {self.scanned_rows[step.source]:,} rows read")
+        elif self.analyze and step.rows is not None:
+            figures.append(f"actual {step.rows:,} rows, {step.seconds * 1000:,.1f} ms"
+                           + (f", peak {step.subtree_peak_bytes() / 1048576:,.1f} MB" if self.trace_memory else ""))
+        if figures:
+            text += "  (" + "; ".join(figures) + ")"
+        lines.append(text)
+        lines.extend(f"{indent}      {note}" for note in step.notes)
+        for input_step in step.inputs:
+            self._describe(input_step, depth + 1, lines)
+
+
+class QueryCancelled(Exception):
+    """Raised inside a running query's row pipeline once its Cancel button has been pressed."""
+
+
+class RunningAggregate:
+    """
+    Constant-memory count, sum, min, max and running mean/variance of one aggregated field of a group.
+    """
+    __slots__ = ("count", "numeric_count", "total", "mean", "m2", "minimum", "maximum")
+
+    def __init__(self):
+        self.count = 0
+        self.numeric_count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, number):
+        self.count += 1
+        if number != number:
+            return
+        self.numeric_count += 1
+        self.total += number
+        delta = number - self.mean
+        self.mean += delta / self.numeric_count
+        self.m2 += delta * (number - self.mean)
+        if number < self.minimum:
+            self.minimum = number
+        if number > self.maximum:
+            self.maximum = number
+
+    def result(self, func):
+        """Value of COUNT/SUM/AVG/MIN/MAX for the rows seen so far (None for other functions)."""
+        if func == "COUNT":
+            return self.count
+        if not self.numeric_count:
+            return {"SUM": 0, "AVG": 0, "MIN": "", "MAX": ""}.get(func)
+        return {"SUM": self.total, "AVG": self.mean, "MIN": self.minimum, "MAX": self.maximum}.get(func)
+
+
+class DistinctValues:
+    """Exact COUNT_DISTINCT: the set of non-empty values."""
+    __slots__ = ("values",)
+
+    def __init__(self):
+        self.values = set()
+
+    def add(self, value):
+        if value:
+            self.values.add(value)
+
+    def result(self, func):
+        return len(self.values)
+
+
+_HYPERLOGLOG_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+class HyperLogLog:
+    """
+    APPROX_COUNT_DISTINCT: exact up to HYPERLOGLOG_EXACT_LIMIT values, then a HyperLogLog estimate.
+    """
+    __slots__ = ("values", "registers")
+
+    def __init__(self):
+        self.values = set()
+        self.registers = None
+
+    def add(self, value):
+        if not value:
+            return
+        if self.registers is not None:
+            self._add_hash(self._hash(value))
+            return
+        self.values.add(value)
+        if len(self.values) > HYPERLOGLOG_EXACT_LIMIT:
+            self.registers = bytearray(1 << HYPERLOGLOG_PRECISION)
+            for seen in self.values:
+                self._add_hash(self._hash(seen))
+            self.values = None
+
+    @staticmethod
+    def _hash(value):
+        # hash() of a str is salted per process, which would make the estimate change from run to run.
+        return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def _add_hash(self, value_hash):
+        register = value_hash >> (64 - HYPERLOGLOG_PRECISION)
+        remaining_bits = value_hash & ((1 << (64 - HYPERLOGLOG_PRECISION)) - 1)
+        rank = 64 - HYPERLOGLOG_PRECISION - remaining_bits.bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def result(self, func):
+        if self.registers is None:
+            return len(self.values)
+        register_count = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / register_count)
+        estimate = alpha * register_count * register_count / sum(
+            _HYPERLOGLOG_POWERS[rank] for rank in self.registers)
+        empty_registers = self.registers.count(0)
+        if estimate <= 2.5 * register_count and empty_registers:
+            estimate = register_count * math.log(register_count / empty_registers)  # Linear counting
+        return int(round(estimate))
+
+
+# Quantile returned by each quantile aggregate (the APPROX_ variants use the same table)
+AGGREGATE_QUANTILES = {"MEDIAN": 0.5, "P95": 0.95}
+
+
+class ExactQuantiles:
+    """Exact MEDIAN/P95: every number of the group, linearly interpolated between closest ranks."""
+    __slots__ = ("numbers", "is_sorted")
+
+    def __init__(self):
+        self.numbers = array('d')
+        self.is_sorted = True
+
+    def add(self, number):
+        if number == number:
+            self.numbers.append(number)
+            self.is_sorted = False
+
+    def result(self, func):
+        if not self.numbers:
+            return ""
+        if not self.is_sorted:
+            self.numbers = array('d', sorted(self.numbers))
+            self.is_sorted = True
+        position = AGGREGATE_QUANTILES[func] * (len(self.numbers) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(self.numbers) - 1)
+        return self.numbers[lower] + (self.numbers[upper] - self.numbers[lower]) * (position - lower)
+
+
+class KLLSketch:
+    """
+    APPROX_MEDIAN/APPROX_P95: a KLL quantile sketch holding about 3k values per group.
+    """
+    __slots__ = ("compactors", "size", "max_size")
+
+    def __init__(self):
+        self.compactors = []
+        self.size = 0
+        self._grow()
+
+    def _capacity(self, height):
+        return int(math.ceil(KLL_SKETCH_SIZE * (2 / 3) ** (len(self.compactors) - height - 1))) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(height) for height in range(len(self.compactors)))
+
+    def add(self, number):
+        if number != number:
+            return
+        self.compactors[0].append(number)
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        for height, compactor in enumerate(self.compactors):
+            if len(compactor) >= self._capacity(height):
+                if height + 1 == len(self.compactors):
+                    self._grow()
+                compactor.sort()
+                leftover = [compactor.pop()] if len(compactor) % 2 else []
+                self.compactors[height + 1].extend(compactor[random.getrandbits(1)::2])
+                self.compactors[height] = leftover
+                break
+        self.size = sum(len(compactor) for compactor in self.compactors)
+
+    def result(self, func):
+        weighted = sorted((number, 1 << height) for height, compactor in enumerate(self.compactors)
+                          for number in compactor)
+        if not weighted:
+            return ""
+        target = AGGREGATE_QUANTILES[func[len("APPROX_"):]] * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for number, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return number
+        return weighted[-1][0]
+
+
+class ValueFrequencies:
+    """Exact MODE: a count of every non-empty value; ties go to the value seen first."""
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, value):
+        if value:
+            self.counts[value] += 1
+
+    def result(self, func):
+        return self.counts.most_common(1)[0][0] if self.counts else ""
+
+
+class SpaceSaving:
+    """
+    APPROX_MODE: Space-Saving heavy hitters over SPACE_SAVING_COUNTERS tracked values.
+    """
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, value):
+        if not value:
+            return
+        counts = self.counts
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < SPACE_SAVING_COUNTERS:
+            counts[value] = 1
+        else:
+            smallest = min(counts, key=counts.__getitem__)
+            counts[value] = counts.pop(smallest) + 1
+
+    def result(self, func):
+        return max(self.counts, key=self.counts.__getitem__) if self.counts else ""
+
+
+# Aggregate functions offered by the query designer: accumulator class and the column form it reads
+AGGREGATE_FUNCTIONS = {
+    "COUNT": (RunningAggregate, "number"), "SUM": (RunningAggregate, "number"),
+    "AVG": (RunningAggregate, "number"), "MIN": (RunningAggregate, "number"),
+    "MAX": (RunningAggregate, "number"),
+    "COUNT_DISTINCT": (DistinctValues, "text"), "MEDIAN": (ExactQuantiles, "number"),
+    "P95": (ExactQuantiles, "number"), "MODE": (ValueFrequencies, "text"),
+    "APPROX_COUNT_DISTINCT": (HyperLogLog, "text"), "APPROX_MEDIAN": (KLLSketch, "number"),
+    "APPROX_P95": (KLLSketch, "number"), "APPROX_MODE": (SpaceSaving, "text"),
+}
+
+
+# Characters mapped to their width class: d(igit), u(ppercase), l(owercase), s(pace); anything else counts as 'u'
+_CHAR_CLASS_TABLE = str.maketrans("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz ",
+                                  "d" * 10 + "u" * 26 + "l" * 26 + "s")
+
+
+class TextWidthCache:
+    """
+    Caches font.measure() results per (font, text); long text is estimated from character classes.
+    """
+
+    def __init__(self):
+        self._fonts = {}  # font name -> (tkFont.Font, {text: width}, {class: average width})
+
+    def _font_entry(self, font_name):
+        entry = self._fonts.get(font_name)
+        if entry is None:
+            font = tkFont.Font(font=font_name)
+            class_widths = {
+                "d": font.measure("0123456789") / 10,
+                "u": font.measure("ABCDEFGHIJKLMNOPQRSTUVWXYZ") / 26,
+                "l": font.measure("abcdefghijklmnopqrstuvwxyz") / 26,
+                "s": font.measure("          ") / 10,
+            }
+            entry = self._fonts[font_name] = (font, {}, class_widths)
+        return entry
+
+    def measure(self, font_name, text):
+        font, widths, class_widths = self._font_entry(font_name)
+        width = widths.get(text)
+        if width is None:
+            if len(text) > TEXT_WIDTH_EXACT_CHARS:
+                classes = text.translate(_CHAR_CLASS_TABLE)
+                counts = {name: classes.count(name) for name in "dls"}
+                counts["u"] = len(text) - sum(counts.values())
+                width = int(sum(count * class_widths[name] for name, count in counts.items()))
+            else:
+                width = font.measure(text)
+            if len(widths) >= TEXT_WIDTH_CACHE_SIZE:
+                widths.clear()
+            widths[text] = width
+        return width
+
+
+_text_widths = TextWidthCache()
+
+
+def percentile_positions(total, sample_size=COLUMN_WIDTH_SAMPLE_ROWS):
+    """Returns up to sample_size positions spread evenly over range(total), always including the first and last."""
+    if total <= sample_size:
+        return range(total)
+    return sorted({(total - 1) * i // (sample_size - 1) for i in range(sample_size)})
+
+
+def sample_tree_rows(tree, sample_size=COLUMN_WIDTH_SAMPLE_ROWS):
+    """Values of up to sample_size items spread over the whole of a Treeview."""
+    children = tree.get_children()
+    return [tree.item(children[i], "values") for i in percentile_positions(len(children), sample_size)]
+
+
+def autosize_columns(tree, sample_rows, strip_sort_marker=True):
+    """Fits each column of tree to its heading and sample rows, within COLUMN_MIN_WIDTH..COLUMN_MAX_WIDTH."""
+    font_name = ttk.Style().lookup("Treeview", "font") or "TkDefaultFont"
+    for col_index, col_id in enumerate(tree["columns"]):
+        header_text = tree.heading(col_id, "text")
+        if strip_sort_marker:
+            header_text = header_text.split(" ")[0]
+        max_width = _text_widths.measure(font_name, header_text) + COLUMN_WIDTH_PADDING
+        for values in sample_rows:
+            if max_width >= COLUMN_MAX_WIDTH:
+                break
+            cell_value = str(values[col_index]) if values and col_index < len(values) else ""
+            max_width = max(max_width, _text_widths.measure(font_name, cell_value) + COLUMN_WIDTH_PADDING)
+        tree.column(col_id, width=min(max(max_width, COLUMN_MIN_WIDTH), COLUMN_MAX_WIDTH), stretch=False)
+
+
+def tree_window_row_count(tree, height, first_item=None):
+    """Rows of a virtual Treeview window that fit in height pixels below the headings."""
+    style = ttk.Style()
+    row_height = int(style.lookup("Treeview", "rowheight") or 0)
+    if row_height <= 0:
+        row_height = tkFont.nametofont("TkDefaultFont").metrics("linespace") + 2
+    first_bbox = tree.bbox(first_item) if first_item else None
+    heading_height = first_bbox[1] if first_bbox else row_height + 4
+    return max(1, (height - heading_height) // row_height)
+
+
+def wheel_scroll_steps(event):
+    """Notches scrolled by a mouse-wheel event, negative for up."""
+    if event.num == 4:
+        return -1
+    if event.num == 5:
+        return 1
+    steps = -1 if event.delta > 0 else 1
+    if abs(event.delta) >= 120:  # Windows reports multiples of 120 per notch, macOS small deltas
+        steps *= abs(event.delta) // 120
+    return steps
 
 
 class HelpWindow(tk.Toplevel):
@@ -419,8 +1790,7 @@ class BatchOperationsDialog(tk.Toplevel):
             changes.append(
                 {"original_index": index, "column": update_col, "old_value": old_value, "new_value": update_val})
             self.app.table_data_cache[self.internal_key][index][update_col] = update_val
-            if self.app.file_type == 'xml':
-                self.app.table_data_cache[self.internal_key][index]['_element'].find(update_col).text = update_val
+            self.app.write_cell_to_element(self.app.table_data_cache[self.internal_key][index], update_col, update_val)
 
         if changes:
             self.app.push_undo({"action": "batch_update", "changes": changes, "internal_key": self.internal_key})
@@ -441,11 +1811,18 @@ class TableViewTab(ttk.Frame):
         self.quick_filter_var = tk.StringVar()
         self.nav_status_var = tk.StringVar()
         self.sort_criteria = []
-        self.current_view_data = []
+        self.current_view_data = []  # Row indices into the cached ColumnarTable, in view order
         self.virtual_view_top_index = 0
+        self.window_row_count = VIRTUAL_TABLE_ROW_COUNT  # Rows in the visible window, sized from the widget height
+        self._repaint_after_id = None
         self.selected_data_index = None
         self.active_cell_editor = None
         self.right_clicked_column = None
+        self._row_items = []  # Pool of Treeview items reused for the visible window, in display order
+        self._attached_row_count = 0
+        self._filter_after_id = None
+        self._filter_generation = 0
+        self._filter_base = None  # (filter text, table version, matching row indices in table order)
 
         self._setup_widgets()
         self.display_table_view_data()
@@ -477,6 +1854,16 @@ class TableViewTab(ttk.Frame):
         self.table_treeview.bind("<Button-1>", self.on_table_tree_click)
         self.table_treeview.bind("<Button-3>", self._show_header_context_menu)
         self.table_treeview.bind("<Double-1>", self.on_table_cell_or_header_double_click)
+        self.table_treeview.bind("<Configure>", self._on_table_resize)
+        self.table_treeview.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.table_treeview.bind("<Button-4>", self._on_mouse_wheel)
+        self.table_treeview.bind("<Button-5>", self._on_mouse_wheel)
+        self.table_treeview.bind("<Prior>", lambda e: self._on_virtual_scroll("scroll", -1, "pages") or "break")
+        self.table_treeview.bind("<Next>", lambda e: self._on_virtual_scroll("scroll", 1, "pages") or "break")
+        self.table_treeview.bind("<Up>", lambda e: self._move_selection(-1))
+        self.table_treeview.bind("<Down>", lambda e: self._move_selection(1))
+        self.table_treeview.bind("<Control-Home>", lambda e: self._nav_top() or "break")
+        self.table_treeview.bind("<Control-End>", lambda e: self._nav_end() or "break")
 
         nav_frame = ttk.Frame(self, padding=2)
         nav_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=(5, 0))
@@ -504,7 +1891,8 @@ class TableViewTab(ttk.Frame):
             return
 
         column_id = self.right_clicked_column
-        all_values = [row.get(column_id, "") for row in self.current_view_data]
+        master_data = self._master_table()
+        all_values = [master_data.get_value(i, column_id) for i in self.current_view_data]
 
         total_rows = len(all_values)
         non_empty_values = [v for v in all_values if v is not None and str(v).strip() != ""]
@@ -537,24 +1925,7 @@ class TableViewTab(ttk.Frame):
         messagebox.showinfo(f"Column Statistics", stats_message, parent=self)
 
     def display_table_view_data(self):
-        if self.app.file_type == 'xml' and self.internal_key not in self.app.table_data_cache:
-            parent_element = self.table_info["parent_element"]
-            row_tag = self.table_info["row_tag"]
-            row_elements = parent_element.findall(row_tag)
-            parsed_data = []
-            for i, row_element in enumerate(row_elements):
-                row_data = {"_element": row_element, "_original_index": i}
-                for col_name in self.table_info["columns"]:
-                    col_data_element = row_element.find(col_name)
-                    cell_text = col_data_element.text.strip() if col_data_element is not None and col_data_element.text else ""
-                    row_data[col_name] = cell_text
-                parsed_data.append(row_data)
-            self.app.table_data_cache[self.internal_key] = parsed_data
-        elif self.app.file_type == 'csv':
-            if not self.app.table_data_cache[self.internal_key] or not any(
-                    "_original_index" in row for row in self.app.table_data_cache[self.internal_key]):
-                for i, row in enumerate(self.app.table_data_cache[self.internal_key]):
-                    row["_original_index"] = i
+        self.app.get_table_data(self.internal_key)
 
         columns = self.table_info["columns"]
         display_columns = ["#"] + columns
@@ -571,48 +1942,68 @@ class TableViewTab(ttk.Frame):
         self.resize_columns()
 
     def _repopulate_virtual_table(self):
-        for item in self.table_treeview.get_children():
-            self.table_treeview.delete(item)
-
+        """Shows the current window by rewriting a fixed pool of Treeview items in place."""
+        tree = self.table_treeview
+        if self._repaint_after_id is not None:
+            self.after_cancel(self._repaint_after_id)
+            self._repaint_after_id = None
         start_index = self.virtual_view_top_index
-        end_index = start_index + VIRTUAL_TABLE_ROW_COUNT
+        end_index = start_index + self.window_row_count
         data_slice = self.current_view_data[start_index:end_index]
 
+        while len(self._row_items) < len(data_slice):
+            self._row_items.append(tree.insert("", "end"))
+            self._attached_row_count += 1
+        for position in range(self._attached_row_count, len(data_slice)):
+            tree.move(self._row_items[position], "", position)
+        if len(data_slice) < self._attached_row_count:
+            tree.detach(*self._row_items[len(data_slice):self._attached_row_count])
+        self._attached_row_count = len(data_slice)
+
         columns = self.table_info["columns"]
-        all_display_columns = ["#"] + columns
+        master_data = self._master_table()
 
-        for i, row_data in enumerate(data_slice):
+        for i, row_index in enumerate(data_slice):
             actual_view_index = start_index + i
-            row_data["#"] = str(actual_view_index + 1)
-            display_values = [row_data.get(col_id, "") for col_id in all_display_columns]
+            display_values = [str(actual_view_index + 1)] + [master_data.get_value(row_index, col_id) for col_id in columns]
+            tree.item(self._row_items[i], values=display_values, tags=self._row_tags(actual_view_index))
 
-            tags = (str(actual_view_index),)
-            if self.selected_data_index == actual_view_index:
-                tags += ('selected',)
+        self._update_nav_controls()
 
-            self.table_treeview.insert("", "end", values=display_values, tags=tags)
+    def _row_tags(self, view_index):
+        if self.selected_data_index == view_index:
+            return (str(view_index), 'selected')
+        return (str(view_index),)
 
-        self._update_nav_controls()
+    def _row_item_for_view_index(self, view_index):
+        """Returns the pooled item showing view_index, or None if that row is outside the window."""
+        position = view_index - self.virtual_view_top_index if view_index is not None else -1
+        return self._row_items[position] if 0 <= position < self._attached_row_count else None
+
+    def _retag_row(self, view_index):
+        item_id = self._row_item_for_view_index(view_index)
+        if item_id is not None:
+            self.table_treeview.item(item_id, tags=self._row_tags(view_index))
 
     def _update_virtual_scrollbar(self):
         total_rows = len(self.current_view_data)
-        if total_rows <= VIRTUAL_TABLE_ROW_COUNT:
+        if total_rows <= self.window_row_count:
             self.table_treeview_vsb.set(0, 1)
         else:
             upper = self.virtual_view_top_index / total_rows if total_rows > 0 else 0
-            lower = (self.virtual_view_top_index + VIRTUAL_TABLE_ROW_COUNT) / total_rows if total_rows > 0 else 1
+            lower = (self.virtual_view_top_index + self.window_row_count) / total_rows if total_rows > 0 else 1
             self.table_treeview_vsb.set(upper, lower)
 
     def _on_virtual_scroll(self, action, value, units=None):
         total_rows = len(self.current_view_data)
-        if total_rows <= VIRTUAL_TABLE_ROW_COUNT: return
+        if total_rows <= self.window_row_count: return
 
-        max_top_index = total_rows - VIRTUAL_TABLE_ROW_COUNT
+        max_top_index = total_rows - self.window_row_count
         if action == "moveto":
-            new_top_index = int(float(value) * max_top_index)
+            new_top_index = int(float(value) * total_rows)
         elif action == "scroll":
             if units == "pages":
-                new_top_index = self.virtual_view_top_index + (int(value) * VIRTUAL_TABLE_ROW_COUNT)
+                new_top_index = self.virtual_view_top_index + (int(value) * self.window_row_count)
             else:
                 new_top_index = self.virtual_view_top_index + int(value)
         else:
@@ -620,25 +2011,63 @@ class TableViewTab(ttk.Frame):
 
         new_top_index = max(0, min(new_top_index, max_top_index))
         if new_top_index != self.virtual_view_top_index:
+            if self.active_cell_editor: self._finish_cell_edit()
             self.virtual_view_top_index = new_top_index
-            self._repopulate_virtual_table()
             self._update_virtual_scrollbar()
+            self._schedule_repaint()
+
+    def _schedule_repaint(self):
+        """Repaints the window once for a burst of scroll events instead of once per event."""
+        if self._repaint_after_id is None:
+            self._repaint_after_id = self.after(SCROLL_REPAINT_DELAY_MS, self._repopulate_virtual_table)
+
+    def _on_mouse_wheel(self, event):
+        self._on_virtual_scroll("scroll", wheel_scroll_steps(event) * WHEEL_SCROLL_ROWS, "units")
+        return "break"
+
+    def _on_table_resize(self, event):
+        first_item = self._row_items[0] if self._attached_row_count else None
+        window_row_count = tree_window_row_count(self.table_treeview, event.height, first_item)
+        if window_row_count == self.window_row_count:
+            return
+        self.window_row_count = window_row_count
+        total_rows = len(self.current_view_data)
+        self.virtual_view_top_index = max(0, min(self.virtual_view_top_index, total_rows - window_row_count))
+        self._update_virtual_scrollbar()
+        self._schedule_repaint()
+
+    def _move_selection(self, step):
+        """Moves the selected row by step, scrolling the window only as far as needed to keep it in view."""
+        total_rows = len(self.current_view_data)
+        if total_rows == 0:
+            return "break"
+        if self.selected_data_index is None:
+            target_index = self.virtual_view_top_index
+        else:
+            target_index = max(0, min(self.selected_data_index + step, total_rows - 1))
+        if target_index < self.virtual_view_top_index:
+            self._on_virtual_scroll("scroll", target_index - self.virtual_view_top_index, "units")
+        elif target_index >= self.virtual_view_top_index + self.window_row_count:
+            self._on_virtual_scroll("scroll", target_index - self.virtual_view_top_index - self.window_row_count + 1,
+                                    "units")
+        if self._repaint_after_id is not None:
+            self._repopulate_virtual_table()  # A key press moves one row at a time: paint it now, not after the delay
+        self.select_row_by_index(target_index)
+        return "break"
 
     def _jump_to_virtual_index(self, data_index):
         total_rows = len(self.current_view_data)
         if not (0 <= data_index < total_rows): return
 
-        self.virtual_view_top_index = max(0, min(data_index, total_rows - VIRTUAL_TABLE_ROW_COUNT))
-        self.select_row_by_index(data_index)
+        self.virtual_view_top_index = max(0, min(data_index, total_rows - self.window_row_count))
+        self.selected_data_index = data_index
         self._repopulate_virtual_table()
         self._update_virtual_scrollbar()
 
-        for item_id in self.table_treeview.get_children():
-            tags = self.table_treeview.item(item_id, "tags")
-            if tags and int(tags[0]) == data_index:
-                self.table_treeview.see(item_id)
-                self.table_treeview.focus(item_id)
-                break
+        item_id = self._row_item_for_view_index(data_index)
+        if item_id is not None:
+            self.table_treeview.see(item_id)
+            self.table_treeview.focus(item_id)
 
     def on_table_tree_click(self, event):
         if self.active_cell_editor and event.widget != self.active_cell_editor:
@@ -691,13 +2120,15 @@ class TableViewTab(ttk.Frame):
 
     def select_row_by_index(self, view_index):
         if self.selected_data_index == view_index: return
-        self.selected_data_index = view_index
-        self._repopulate_virtual_table()
+        previous_index, self.selected_data_index = self.selected_data_index, view_index
+        self._retag_row(previous_index)
+        self._retag_row(view_index)
+        self._update_nav_controls()
 
     def deselect_row(self, update_view=True):
         if self.selected_data_index is not None:
-            self.selected_data_index = None
-            if update_view: self._repopulate_virtual_table()
+            previous_index, self.selected_data_index = self.selected_data_index, None
+            if update_view: self._retag_row(previous_index)
         self._update_nav_controls()
 
     def on_table_header_click_for_sort(self, event):
@@ -730,28 +2161,28 @@ class TableViewTab(ttk.Frame):
         editor.destroy()
         if not commit: return
 
-        original_index = self.current_view_data[view_index]["_original_index"]
+        original_index = self.current_view_data[view_index]
         old_value = self.app.table_data_cache[self.internal_key][original_index][column]
 
         if new_value != old_value:
             self.app.table_data_cache[self.internal_key][original_index][column] = new_value
-            self.current_view_data[view_index][column] = new_value
             self.app.push_undo({
                 "action": "edit", "column": column, "old_value": old_value,
                 "new_value": new_value, "internal_key": self.internal_key,
                 "original_index": original_index
             })
-            if self.app.file_type == 'xml':
-                element = self.app.table_data_cache[self.internal_key][original_index]['_element']
-                col_data = element.find(column)
-                if col_data is not None:
-                    col_data.text = new_value
-                else:
-                    ET.SubElement(element, column).text = new_value
+            self.app.write_cell_to_element(self.app.table_data_cache[self.internal_key][original_index], column,
+                                           new_value)
             self._repopulate_virtual_table()
 
     def _on_quick_filter_change(self, *args):
-        self._apply_filter_and_sort()
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.after(QUICK_FILTER_DEBOUNCE_MS, self._apply_filter_and_sort)
+
+    def _master_table(self):
+        table = self.app.get_table_data(self.internal_key)
+        return table if table is not None else ColumnarTable(self.table_info["columns"])
 
     def _apply_filter_and_sort(self):
         if self.internal_key not in self.app.potential_tables:
@@ -759,20 +2190,58 @@ class TableViewTab(ttk.Frame):
             self._update_virtual_table_view()
             return
 
-        master_data = self.app.table_data_cache.get(self.internal_key, [])
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+            self._filter_after_id = None
+        self._filter_generation += 1
+
+        master_data = self._master_table()
         filter_text = self.quick_filter_var.get().lower()
 
-        self.current_view_data = [
-            row for row in master_data
-            if not filter_text or any(filter_text in str(val).lower() for val in row.values())
-        ]
+        # A filter that extends the previous one can only narrow its result, so only those rows are rescanned.
+        candidates = None
+        base = self._filter_base
+        if base and base[1] == master_data.version and filter_text.startswith(base[0]):
+            if filter_text == base[0]:
+                self._show_filtered_rows(master_data, filter_text, base[2])
+                return
+            candidates = base[2]
+
+        scan_size = len(master_data) if candidates is None else len(candidates)
+        if filter_text and scan_size >= QUICK_FILTER_THREAD_ROWS:
+            self.nav_status_var.set(f"Filtering {scan_size:,} rows...")
+            threading.Thread(target=self._quick_filter_worker,
+                             args=(master_data, filter_text, candidates, self._filter_generation),
+                             daemon=True).start()
+            return
+        self._show_filtered_rows(master_data, filter_text, master_data.find_rows(filter_text, candidates))
+
+    def _quick_filter_worker(self, master_data, filter_text, candidates, generation):
+        version = master_data.version
+        try:
+            rows = master_data.find_rows(filter_text, candidates, lambda: generation != self._filter_generation)
+        except IndexError:  # The table was edited mid-scan; _finish_background_filter starts over
+            rows = None
+        if rows is not None or master_data.version != version:
+            self.app.root.after(0, self._finish_background_filter, master_data, filter_text, version, rows,
+                                generation)
+
+    def _finish_background_filter(self, master_data, filter_text, version, rows, generation):
+        if generation != self._filter_generation or not self.winfo_exists():
+            return
+        if master_data.version != version:
+            # Search caches built during the scan may predate the edit.
+            master_data.discard_search_cache()
+            self._apply_filter_and_sort()
+            return
+        self._show_filtered_rows(master_data, filter_text, rows)
+
+    def _show_filtered_rows(self, master_data, filter_text, rows):
+        self._filter_base = (filter_text, master_data.version, rows)
+        self.current_view_data = list(rows)
 
         if self.sort_criteria:
-            for col, direction in reversed(self.sort_criteria):
-                self.current_view_data.sort(
-                    key=lambda item, c=col: str(item.get(c, '')).lower(),
-                    reverse=(direction == 'desc')
-                )
+            master_data.sort_rows(self.current_view_data, self.sort_criteria)
         self.virtual_view_top_index = 0
         self.selected_data_index = None
         self._update_virtual_table_view()
@@ -829,25 +2298,19 @@ class TableViewTab(ttk.Frame):
         if row_num is not None: self._jump_to_virtual_index(row_num - 1)
 
     def resize_columns(self):
-        tree, items_to_check = self.table_treeview, self.table_treeview.get_children()
-        if not tree["columns"]: return
-        style = ttk.Style()
-        font_name = style.lookup("Treeview", "font") or "TkDefaultFont"
-        tree_font = tkFont.Font(font=font_name)
-        padding = 20
-        for col_id in tree["columns"]:
-            header_text = tree.heading(col_id, "text").split(" ")[0]
-            max_width = tree_font.measure(header_text) + padding
-            col_index = tree["columns"].index(col_id)
-            for item_id in items_to_check:
-                values = tree.item(item_id, "values")
-                cell_value = str(values[col_index]) if values and col_index < len(values) else ""
-                max_width = max(max_width, tree_font.measure(cell_value) + padding)
-            tree.column(col_id, width=min(max(max_width, 50), 500), stretch=False)
+        if not self.table_treeview["columns"]: return
+        columns = self.table_info["columns"]
+        master_data = self._master_table()
+        # Sample across the whole view rather than the visible window, straight from the table cache.
+        sample_rows = [[str(position + 1)] + [master_data.get_value(self.current_view_data[position], col_id)
+                                               for col_id in columns]
+                       for position in percentile_positions(len(self.current_view_data))]
+        autosize_columns(self.table_treeview, sample_rows)
 
     def get_current_table_data(self):
         headers = self.table_info["columns"]
-        rows_to_write = [[row.get(h, "") for h in headers] for row in self.current_view_data]
+        master_data = self._master_table()
+        rows_to_write = [[master_data.get_value(i, h) for h in headers] for i in self.current_view_data]
         return headers, rows_to_write
 
 
@@ -1012,15 +2475,16 @@ class TransactionalDataChecker(tk.Toplevel):
                 for row in trans_rows:
                     f_key_val = self._get_cell_value(row, trans_key_col)
                     if f_key_val not in primary_keys:
-                        results.append(row)
+                        results.append(dict(row.items()))
             else:  # 'unused'
                 trans_keys = {self._get_cell_value(row, trans_key_col) for row in trans_rows}
                 result_columns = self._get_all_columns(primary_table)
                 for row in primary_rows:
                     p_key_val = self._get_cell_value(row, primary_key_col)
                     if p_key_val not in trans_keys:
-                        results.append(row)
+                        results.append(dict(row.items()))
 
+            # Snapshot the rows: TableRow views would follow later inserts/deletes to other rows.
             self.current_results_data = results
             self._display_results(result_columns)
 
@@ -1048,29 +2512,8 @@ class TransactionalDataChecker(tk.Toplevel):
 
     def _get_rows_from_source(self, table_name):
         key = self.table_combobox_map[table_name]
-        if key in self.table_data_cache:
-            return self.table_data_cache.get(key, [])
-
-        if self.file_type == 'xml':
-            table_info = self.potential_tables.get(key)
-            if not table_info:
-                return []
-
-            parent_element = table_info["parent_element"]
-            row_tag = table_info["row_tag"]
-            row_elements = parent_element.findall(row_tag)
-            parsed_data = []
-            for i, row_element in enumerate(row_elements):
-                row_data = {"_element": row_element, "_original_index": i}
-                for col_name in table_info["columns"]:
-                    col_data_element = row_element.find(col_name)
-                    cell_text = col_data_element.text.strip() if col_data_element is not None and col_data_element.text else ""
-                    row_data[col_name] = cell_text
-                parsed_data.append(row_data)
-            self.table_data_cache[key] = parsed_data
-            return parsed_data
-
-        return []
+        table = self.app.get_table_data(key)
+        return table if table is not None else []
 
     def _get_cell_value(self, row, column):
         return row.get(column, "").strip()
@@ -1080,7 +2523,7 @@ class TransactionalDataChecker(tk.Toplevel):
         return self.potential_tables[key]['columns']
 
     def _export_results(self):
-        if not self.results_tree.get_children():
+        if not self.current_results_data:
             messagebox.showwarning("Export Error", "There are no results to export.", parent=self)
             return
         filepath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")],
@@ -1089,11 +2532,11 @@ class TransactionalDataChecker(tk.Toplevel):
             return
         try:
             delimiter = self.app.csv_delimiter if hasattr(self.app, 'csv_delimiter') else ','
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            columns = list(self.results_tree["columns"])
+            with open(filepath, 'w', newline='', encoding='utf-8', buffering=QUERY_EXPORT_BUFFER_BYTES) as f:
                 writer = csv.writer(f, delimiter=delimiter)
-                writer.writerow(self.results_tree["columns"])
-                for item_id in self.results_tree.get_children():
-                    writer.writerow(self.results_tree.item(item_id, "values"))
+                writer.writerow(columns)
+                writer.writerows([row.get(col, "") for col in columns] for row in self.current_results_data)
             messagebox.showinfo("Success", "Results exported successfully.", parent=self)
         except Exception as e:
             messagebox.showerror("Export Failed", f"An error occurred during export:\n{e}", parent=self)
@@ -1103,30 +2546,7 @@ class TransactionalDataChecker(tk.Toplevel):
         if not tree["columns"]:
             return
         try:
-            items_to_sample = tree.get_children()[:VIRTUAL_TABLE_ROW_COUNT]
-
-            style = ttk.Style()
-            font_name = style.lookup("Treeview", "font") or "TkDefaultFont"
-            tree_font = tkFont.Font(font=font_name)
-            padding = 20
-
-            for col_id in tree["columns"]:
-                header_text = tree.heading(col_id, "text")
-                max_width = tree_font.measure(header_text) + padding
-
-                col_index = tree["columns"].index(col_id)
-                for item_id in items_to_sample:
-                    values = tree.item(item_id, "values")
-                    try:
-                        cell_value = str(values[col_index]) if values and col_index < len(values) else ""
-                        cell_width = tree_font.measure(cell_value) + padding
-                        if cell_width > max_width:
-                            max_width = cell_width
-                    except (ValueError, IndexError):
-                        continue
-
-                max_width = min(max(max_width, 50), 500)
-                tree.column(col_id, width=max_width, stretch=False)
+            autosize_columns(tree, sample_tree_rows(tree), strip_sort_marker=False)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to resize columns: {e}", parent=self)
 
@@ -1175,12 +2595,25 @@ class QueryDesigner(tk.Toplevel):
         # --- Shared State ---
         self.limit_enabled_var = tk.BooleanVar(value=False)
         self.limit_value_var = tk.IntVar(value=100)
+        self.order_by_var = tk.StringVar()  # "field [ASC|DESC], ..." as in an ORDER BY clause
         self.manual_edit_mode = tk.BooleanVar(value=False)
+        self.plan_trace_memory_var = tk.BooleanVar(value=True)  # EXPLAIN ANALYZE measures memory with tracemalloc
 
         # --- Results State ---
         self.current_results_data = []
         self.results_sort_col = None
         self.results_sort_asc = True
+        # The results grid shows a window over current_results_data, as TableViewTab does over its table.
+        self.results_columns = []
+        self.results_view_rows = range(0)  # Positions in current_results_data, in display order
+        self.results_top_index = 0
+        self.results_window_rows = VIRTUAL_TABLE_ROW_COUNT
+        self.results_selected_index = None  # Display position of the selected row
+        self._results_row_items = []  # Pool of Treeview items reused for the visible window
+        self._results_attached_count = 0
+        self._results_repaint_after_id = None
+        self._query_run = None  # {"cancel", "done", "error"} of the query running on a worker thread
+        self._query_cancel_event = None
 
         # --- Intellisense & Help ---
         self.intellisense_popup = None
@@ -1210,6 +2643,7 @@ class QueryDesigner(tk.Toplevel):
         self.querymenu.add_command(label="Fix Column Widths", command=self._resize_query_results_columns,
                                    accelerator="Ctrl+W")
         self.querymenu.add_command(label="Export Results as CSV...", command=self._export_results, accelerator="Ctrl+E")
+        self.querymenu.add_command(label="Export Query to CSV/JSONL...", command=self._export_query)
         self.querymenu.add_separator()
         self.querymenu.add_command(label="Exit", command=self.destroy)
         self.menubar.add_cascade(label="Query", menu=self.querymenu)
@@ -1238,6 +2672,10 @@ class QueryDesigner(tk.Toplevel):
         self.config_notebook.add(sql_view_frame, text="SQL View")
         self._create_sql_view_widgets(sql_view_frame)
 
+        self.query_plan_frame = ttk.Frame(self.config_notebook, padding=10)
+        self.config_notebook.add(self.query_plan_frame, text="Query Plan")
+        self._create_query_plan_widgets(self.query_plan_frame)
+
         results_pane = ttk.Frame(main_paned)
         main_paned.add(results_pane, weight=3)
         self._create_results_widgets(results_pane)
@@ -1246,7 +2684,7 @@ class QueryDesigner(tk.Toplevel):
         self.table2_combo.bind("<<ComboboxSelected>>", self._on_table_select)
         self.results_tree.bind("<Button-1>", self._on_results_click)
 
-        for var in [self.query_type_var, self.limit_enabled_var, self.limit_value_var]:
+        for var in [self.query_type_var, self.limit_enabled_var, self.limit_value_var, self.order_by_var]:
             var.trace_add("write", lambda *args: self._update_query_view())
 
     def _parse_simple_query(self, text, valid_columns):
@@ -1286,7 +2724,7 @@ class QueryDesigner(tk.Toplevel):
                 part = part.strip()
                 op_match = re.search(op_pattern, part, re.IGNORECASE)
                 if not op_match:
-                    date_func_match = re.match(r"(year|month|day)\s+of\s+([\w\.]+)", part, re.I)
+                    date_func_match = re.match(r"(year|month|day)\s+of\s+(@?[\w\.]+)", part, re.I)
                     if not date_func_match:
                         start = text.find(part)
                         return {'success': False, 'error': f"Invalid condition format: '{part}'",
@@ -1325,65 +2763,155 @@ class QueryDesigner(tk.Toplevel):
 
         return {'success': True, 'fields': fields, 'conditions': conditions}
 
-    def _row_matches_filters(self, row1_el, row2_el, condition_node):
+    # Operator spellings produced by the SQL parser (which drops spaces) mapped to the designer's names
+    _OPERATOR_ALIASES = {"NOTCONTAINS": "NOT CONTAINS", "STARTSWITH": "STARTS WITH", "ENDSWITH": "ENDS WITH"}
+    _TEXT_OPERATORS = {
+        "CONTAINS": "({literal} in {cell})", "NOT CONTAINS": "({literal} not in {cell})",
+        "STARTS WITH": "{cell}.startswith({literal})", "ENDS WITH": "{cell}.endswith({literal})",
+        "=": "({cell} == {literal})", "!=": "({cell} != {literal})",
+    }
+    _NUMERIC_OPERATORS = {">", "<", ">=", "<="}
+    _JOIN_TYPE_PATTERN = (r"INNER(?:\s+JOIN)?|LEFT\s+ANTI(?:[-\s]JOIN)?|LEFT(?:\s+OUTER)?(?:\s+JOIN)?"
+                          r"|FULL(?:\s+OUTER)?(?:\s+JOIN)?")
+    _JOIN_SQL_KEYWORDS = {"INNER": "INNER JOIN", "ANTI": "LEFT ANTI-JOIN", "LEFT": "LEFT OUTER JOIN",
+                          "FULL": "FULL OUTER JOIN"}
+
+    def _compile_conditions(self, condition_node, *tables, nullable=False):
+        """Compiles a condition tree into one generated function match(i1, i2, ...) over the tables' row indices."""
+        parameters = ", ".join(f"i{n}" for n in range(1, max(2, len(tables)) + 1))
         if not condition_node:
-            return True
-
-        is_group = 'group' in condition_node
-
-        if not is_group:
-            condition = condition_node
-            table_alias = condition.get('table', 'T1')
-            field, op, value = condition['field'], condition['op'], condition['value']
-
-            target_row = row1_el if table_alias == "T1" else row2_el
-            if target_row is None:
-                return False
-
-            cell_value = self._get_cell_value(target_row, field)
-            cell_compare, value_compare = cell_value.lower(), value.lower()
-
-            match = False
-            if op == "CONTAINS":
-                match = value_compare in cell_compare
-            elif op == "NOT CONTAINS":
-                match = value_compare not in cell_compare
-            elif op == "STARTS WITH":
-                match = cell_compare.startswith(value_compare)
-            elif op == "ENDS WITH":
-                match = cell_compare.endswith(value_compare)
-            elif op == "=":
-                match = cell_compare == value_compare
-            elif op == "!=":
-                match = cell_compare != value_compare
-            else:
-                try:
-                    cell_num, val_num = float(cell_value), float(value)
-                    if op == ">":
-                        match = cell_num > val_num
-                    elif op == "<":
-                        match = cell_num < val_num
-                    elif op == ">=":
-                        match = cell_num >= val_num
-                    elif op == "<=":
-                        match = cell_num <= val_num
-                except (ValueError, TypeError):
-                    pass
-            return match
+            return eval(f"lambda {parameters}: True")
+        aliases = {f"T{n}": table for n, table in enumerate(tables, 1)}
+        namespace = {}
+        samples = {alias: percentile_positions(len(table), QUERY_SELECTIVITY_SAMPLE)
+                   for alias, table in aliases.items() if table is not None}
+        compiler_state = (aliases, namespace, samples, parameters, nullable)
+        source, _, _ = self._compile_condition_node(condition_node, compiler_state)
+        return eval(f"lambda {parameters}: {source}", namespace)
+
+    def _describe_conditions(self, condition_node, *tables, nullable=False):
+        """Returns (text, estimated pass rate) for a condition tree in the order _compile_conditions runs it."""
+        aliases = {f"T{n}": table for n, table in enumerate(tables, 1)}
+        samples = {alias: percentile_positions(len(table), QUERY_SELECTIVITY_SAMPLE)
+                   for alias, table in aliases.items() if table is not None}
+        parameters = ", ".join(f"i{n}" for n in range(1, max(2, len(tables)) + 1))
+        _, rate, text = self._compile_condition_node(condition_node, (aliases, {}, samples, parameters, nullable))
+        return text, rate
+
+    def _compile_condition_node(self, node, compiler_state):
+        """Returns (Python expression, estimated pass rate, text for EXPLAIN) for one node of a condition tree."""
+        if 'group' not in node:
+            source = self._compile_condition_leaf(node, compiler_state)
+            aliases = sorted({f"T{n}" for n in re.findall(r"\[i(\d+)\]", source)})
+            rate = self._estimate_pass_rate(source, aliases, compiler_state)
+            field = node['field'] if not isinstance(node['field'], tuple) else "{} of {}".format(*node['field'])
+            return source, rate, f"{node.get('table', 'T1')}.{field} {node['op']} '{node['value']}' [~{rate:.1%}]"
+
+        group_type = node.get('group', 'AND')
+        children = [self._compile_condition_node(child, compiler_state) for child in node.get('conditions', [])]
+        if group_type == 'NOT':
+            child_source, child_rate, child_text = children[0]
+            return f"(not {child_source})", 1.0 - child_rate, f"NOT {child_text}"
+        if not children:
+            return ("True", 1.0, "TRUE") if group_type == 'AND' else ("False", 0.0, "FALSE")
+
+        if group_type == 'AND':
+            children.sort(key=lambda child: child[1])  # Most selective first
+            rate = 1.0
+            for child in children:
+                rate *= child[1]
         else:
-            group_type = condition_node.get('group', 'AND')
-            conditions = condition_node.get('conditions', [])
-
-            if group_type == 'NOT':
-                return not self._row_matches_filters(row1_el, row2_el, conditions[0])
-
-            for condition in conditions:
-                match = self._row_matches_filters(row1_el, row2_el, condition)
+            children.sort(key=lambda child: -child[1])  # Most likely match first
+            miss_rate = 1.0
+            for child in children:
+                miss_rate *= 1.0 - child[1]
+            rate = 1.0 - miss_rate
+        joiner = " and " if group_type == 'AND' else " or "
+        return ("(" + joiner.join(child[0] for child in children) + ")", rate,
+                "(" + f" {group_type} ".join(child[2] for child in children) + ")")
+
+    def _compile_condition_leaf(self, condition, compiler_state):
+        tables, namespace, _, _, nullable = compiler_state
+        table_alias = condition.get('table', 'T1').upper()
+        table = tables.get(table_alias)
+        if table is None:
+            return "False"
+        row_index = f"i{table_alias[1:]}"
+        source = self._compile_condition_test(condition, table, row_index, namespace)
+        if nullable and source != "False":
+            return f"({row_index} >= 0 and {source})"
+        return source
+
+    def _compile_condition_test(self, condition, table, row_index, namespace):
+        field, value = condition['field'], condition['value']
+        op = condition['op'].upper()
+        op = self._OPERATOR_ALIASES.get(op, op)
+        slot = len(namespace)
+
+        if isinstance(field, tuple):  # (year|month|day, column) from the simple query
+            func, column = field
+            try:
+                namespace[f"k{slot}"] = int(value)
+            except (ValueError, TypeError):
+                return "False"
+            parts = []
+            for cell_value in table.column_values(column):
+                date_value = parse_date(cell_value)
+                parts.append(getattr(date_value, func) if date_value else None)
+            namespace[f"v{slot}"] = parts
+            op = "==" if op == "=" else op
+            if op not in self._NUMERIC_OPERATORS | {"==", "!="}:
+                return "False"
+            # Empty or unparseable dates match no operator, != included.
+            return f"(v{slot}[{row_index}] is not None and v{slot}[{row_index}] {op} k{slot})"
+
+        if op in self._TEXT_OPERATORS:
+            namespace[f"v{slot}"] = table.column_values(field, "lower")
+            namespace[f"k{slot}"] = value.lower()
+            return self._TEXT_OPERATORS[op].format(cell=f"v{slot}[{row_index}]", literal=f"k{slot}")
+        if op in self._NUMERIC_OPERATORS:
+            number = _parse_float(value)
+            if number != number:
+                return "False"
+            # NaN marks cells that are not numbers; every comparison with it is false, as before.
+            namespace[f"v{slot}"] = table.column_values(field, "number")
+            namespace[f"k{slot}"] = number
+            return f"(v{slot}[{row_index}] {op} k{slot})"
+        return "False"
+
+    def _estimate_pass_rate(self, source, aliases, compiler_state):
+        tables, namespace, samples, parameters, _ = compiler_state
+        if not aliases or len(aliases) > 1 or not samples.get(aliases[0]):
+            return 0.5 if aliases else float(eval(source, namespace))
+        test = eval(f"lambda {parameters}: {source}", namespace)
+        return self._sample_pass_rate(test, aliases[0], samples[aliases[0]], parameters.count(",") + 1)
+
+    def _sample_pass_rate(self, predicate, table_alias, positions, arity=2):
+        arguments = [None] * arity
+        position = int(table_alias[1:]) - 1
+        passed = 0
+        for i in positions:
+            arguments[position] = i
+            if predicate(*arguments):
+                passed += 1
+        return passed / len(positions) if positions else 0.0
+
+    def _split_conjuncts(self, condition_node):
+        """Flattens the top-level ANDs of a condition tree into the conditions that must all hold."""
+        if not condition_node:
+            return []
+        if condition_node.get('group') == 'AND':
+            return [conjunct for child in condition_node.get('conditions', [])
+                    for conjunct in self._split_conjuncts(child)]
+        return [condition_node]
 
-                if group_type == 'AND' and not match: return False
-                if group_type == 'OR' and match: return True
+    def _condition_tables(self, condition_node):
+        if 'group' not in condition_node:
+            return {condition_node.get('table', 'T1')}
+        return set().union(*(self._condition_tables(child) for child in condition_node.get('conditions', [])))
 
-            return True if group_type == 'AND' else False
+    def _simple_filters_to_tree(self, filters):
+        return {'group': 'AND', 'conditions': [dict(f, table='T1') for f in filters]}
 
     def _create_visual_designer_widgets(self, parent):
         parent.grid_columnconfigure(0, weight=1)
@@ -1512,9 +3040,9 @@ class QueryDesigner(tk.Toplevel):
 
         agg_frame = ttk.Frame(output_frame);
         agg_frame.grid(row=1, column=1, padx=5, sticky="n")
-        agg_values = ["None", "COUNT", "SUM", "AVG", "MIN", "MAX"];
+        agg_values = ["None"] + list(AGGREGATE_FUNCTIONS)
         self.agg_combo = ttk.Combobox(agg_frame, textvariable=self.aggregate_func_var, values=agg_values,
-                                      state="readonly", width=8);
+                                      state="readonly", width=22);
         self.agg_combo.pack(pady=2)
         ttk.Button(agg_frame, text="Add Field >", command=self._add_output_field).pack(pady=2)
 
@@ -1674,6 +3202,7 @@ class QueryDesigner(tk.Toplevel):
         self._update_available_fields()
         self.group_available_lb.delete(0, tk.END)
         self.grouped_by_lb.delete(0, tk.END)
+        self.order_by_var.set("")
 
         all_fields = self.available_fields_lb.get(0, tk.END)
         for field in all_fields:
@@ -1693,6 +3222,8 @@ class QueryDesigner(tk.Toplevel):
             self.filter_field_combo.config(state="readonly" if cols else "disabled")
             self.join_type_rb_inner.config(state="disabled")
             self.join_type_rb_anti.config(state="disabled")
+            self.join_type_rb_left.config(state="disabled")
+            self.join_type_rb_full.config(state="disabled")
         elif is_join:
             self.condition_type_var.set("join")
             self.join_radio.config(state="normal")
@@ -1713,11 +3244,15 @@ class QueryDesigner(tk.Toplevel):
 
             self.join_type_rb_inner.config(state="normal")
             self.join_type_rb_anti.config(state="normal")
+            self.join_type_rb_left.config(state="normal")
+            self.join_type_rb_full.config(state="normal")
         else:
             self.join_radio.config(state="disabled")
             self.filter_radio.config(state="disabled")
             self.join_type_rb_inner.config(state="disabled")
             self.join_type_rb_anti.config(state="disabled")
+            self.join_type_rb_left.config(state="disabled")
+            self.join_type_rb_full.config(state="disabled")
 
         self._on_condition_type_change()
         self._validate_and_highlight_conditions()
@@ -1726,6 +3261,13 @@ class QueryDesigner(tk.Toplevel):
         t1, t2 = self.table1_var.get(), self.table2_var.get()
         select_clause = ",\n  ".join(self.selected_fields_lb.get(0, tk.END)) or "[Select Output Fields]"
         limit_str = f"\nLIMIT {self.limit_value_var.get()}" if self.limit_enabled_var.get() else ""
+        order_by = self._parse_order_by_list(self.order_by_var.get())
+        if order_by:
+            order_items = [f"{field} {direction}" for field, direction in order_by]
+            limit_str = "\nORDER BY\n  " + ",\n  ".join(order_items) + limit_str
+        group_by_fields = self.grouped_by_lb.get(0, tk.END)
+        if group_by_fields:
+            limit_str = "\nGROUP BY\n  " + ",\n  ".join(group_by_fields) + limit_str
         query_str = ""
 
         join_conditions = []
@@ -1745,7 +3287,7 @@ class QueryDesigner(tk.Toplevel):
             where_clause = " ".join(filter_clause_parts) or "[Define Filter Conditions]"
             query_str = f"SELECT\n  {select_clause}\nFROM\n  '{t1}' AS T1\nWHERE\n  {where_clause}{limit_str};"
         elif t1 and t2:
-            join_type = self.query_type_var.get().replace("ANTI", "ANTI-JOIN")
+            join_type = self._JOIN_SQL_KEYWORDS.get(self.query_type_var.get(), "INNER JOIN")
             on_clause = "\n    AND ".join(join_conditions) if join_conditions else "[Define Join Conditions]"
             where_clause = " ".join(filter_clause_parts)
             where_str = f"\nWHERE\n  {where_clause}" if where_clause else ""
@@ -1816,23 +3358,60 @@ class QueryDesigner(tk.Toplevel):
 
         return eval_stack[0]
 
-    def _run_filter_query(self, config=None):
+    def _run_filter_query(self, config=None, export_path=None, explain=None):
         try:
-            t1_name = self.table1_var.get()
-            condition_tree = self._get_conditions_from_list()
+            self._begin_query()
+            if config:
+                t1_name = config["table1"]
+                condition_tree = {'group': 'AND', 'conditions': [
+                    {'type': 'filter', 'table': alias, 'field': field, 'op': op, 'value': value}
+                    for alias, field, op, value in config.get("filter_conditions", [])
+                ]}
+                output_fields = config["output_fields"]
+                group_by_fields = config.get("group_by_fields", [])
+                order_by = config.get("order_by", [])
+                limit = config.get("limit_value") if config.get("limit_enabled") else -1
+            else:
+                t1_name = self.table1_var.get()
+                condition_tree = self._get_conditions_from_list()
+                output_fields = self.selected_fields_lb.get(0, tk.END)
+                group_by_fields = self.grouped_by_lb.get(0, tk.END)
+                order_by = self._parse_order_by_list(self.order_by_var.get())
+                limit = self.limit_value_var.get() if self.limit_enabled_var.get() else -1
 
-            rows1 = self._get_rows_from_source(t1_name)
+            table1 = self._get_rows_from_source(t1_name)
             cols1 = self._get_all_columns(t1_name)
-            base_results = []
-
-            for row1 in rows1:
-                if self._row_matches_filters(row1, None, condition_tree):
-                    result_row = {f"T1: {col}": self._get_cell_value(row1, col) for col in cols1}
-                    base_results.append(result_row)
+            if list(output_fields) == ["*"]:
+                output_fields = [f"T1: {col}" for col in cols1]
+            fingerprint = self._query_fingerprint("filter", [t1_name], condition_tree, output_fields,
+                                                  group_by_fields, order_by, limit)
+            if not export_path and not explain and self._show_cached_results(fingerprint, [table1]):
+                return
 
-            final_results = self._run_query_engine(base_results)
-            self.current_results_data = final_results
-            self._display_results_grid(self.selected_fields_lb.get(0, tk.END))
+            matches = self._compile_conditions(condition_tree, table1)
+            plan = self._new_query_plan(explain)
+            scan = self._query_scan(plan)
+            # Rows are produced lazily, so a LIMIT without GROUP BY or ORDER BY stops the scan as soon as it is met.
+            matching_rows = (i1 for i1 in scan(range(len(table1)), "T1") if matches(i1, None))
+            operators = None
+            if plan:
+                plan.add("Scan", f"T1 '{t1_name}'", len(table1), source="T1")
+                if normalized_condition_tree(condition_tree):
+                    description, pass_rate = self._describe_conditions(condition_tree, table1)
+                    matching_rows = plan.add("Filter", description, len(table1) * pass_rate).measure(matching_rows)
+                operators = self._explain_query_engine(plan, group_by_fields, output_fields, limit, order_by)
+            result_rows = self._run_query_engine(
+                matching_rows, self._row_field_reader([table1], single_table=True), [f"T1: {col}" for col in cols1],
+                group_by_fields, output_fields, limit, order_by, operators)
+            if plan:
+                self._show_query_plan(plan, result_rows)
+                return
+            if export_path:
+                self._start_export(export_path, list(output_fields),
+                                   ([row.get(field, "") for field in output_fields] for row in result_rows))
+                return
+            results = []
+            self._start_query(output_fields, results, result_rows, results.append, (fingerprint, [table1]))
         except ValueError as e:
             messagebox.showerror("Query Error", f"Invalid condition logic: {e}", parent=self)
         except Exception as ex:
@@ -1846,15 +3425,18 @@ class QueryDesigner(tk.Toplevel):
                 text += " ▲" if self.results_sort_asc else " ▼"
             self.results_tree.heading(col, text=text)
 
-    def _run_join_query(self, config=None):
+    def _run_join_query(self, config=None, export_path=None, explain=None):
         try:
+            self._begin_query()
             join_conditions = []
+            join_steps = []
             filter_conditions_tree = None
 
             if config:
                 t1_name = config["table1"]
                 t2_name = config["table2"]
                 join_conditions = config["join_conditions"]
+                join_steps = config.get("joins", [])
 
                 filter_conditions_tree = {'group': 'AND', 'conditions': [
                     {'type': 'filter', 'table': f[0], 'field': f[1], 'op': o, 'value': v} for f, o, v in
@@ -1862,6 +3444,7 @@ class QueryDesigner(tk.Toplevel):
                 ]}
                 query_type = config["query_type"]
                 output_fields = config["output_fields"]
+                order_by = config.get("order_by", [])
                 limit = config.get("limit_value") if config.get("limit_enabled") else -1
             else:
                 t1_name, t2_name = self.table1_var.get(), self.table2_var.get()
@@ -1883,47 +3466,388 @@ class QueryDesigner(tk.Toplevel):
 
                 query_type = self.query_type_var.get()
                 output_fields = self.selected_fields_lb.get(0, tk.END)
+                order_by = self._parse_order_by_list(self.order_by_var.get())
                 limit = self.limit_value_var.get() if self.limit_enabled_var.get() else -1
 
-            cols1, cols2 = self._get_all_columns(t1_name), self._get_all_columns(t2_name)
-            rows2 = self._get_rows_from_source(t2_name)
-            t2_join_fields = [jc[1] for jc in join_conditions]
-            table2_index = defaultdict(list)
-            for row_el in rows2:
-                join_key = tuple(self._get_cell_value(row_el, f) for f in t2_join_fields)
-                table2_index[join_key].append(row_el)
-
-            results = []
-            t1_join_fields = [jc[0] for jc in join_conditions]
-            rows1 = self._get_rows_from_source(t1_name)
-            for row1_el in rows1:
-                join_key = tuple(self._get_cell_value(row1_el, f) for f in t1_join_fields)
-                matching_rows2 = table2_index.get(join_key, [])
-
-                if query_type == "INNER" and matching_rows2:
-                    for row2_el in matching_rows2:
-                        if self._row_matches_filters(row1_el, row2_el, filter_conditions_tree):
-                            result_row = {"Match_Count": len(matching_rows2)}
-                            result_row.update({f"T1: {c}": self._get_cell_value(row1_el, c) for c in cols1})
-                            result_row.update({f"T2: {c}": self._get_cell_value(row2_el, c) for c in cols2})
-                            results.append(result_row)
-                elif query_type == "ANTI" and not matching_rows2:
-                    if self._row_matches_filters(row1_el, None, filter_conditions_tree):
-                        result_row = {"Match_Count": 0}
-                        result_row.update({f"T1: {c}": self._get_cell_value(row1_el, c) for c in cols1})
-                        result_row.update({f"T2: {c}": "" for c in cols2})
-                        results.append(result_row)
-                if limit != -1 and len(results) >= limit:
-                    break
-
-            self.current_results_data = results
-            self._display_results_grid(output_fields)
+            if len(join_steps) > 1:
+                table_names = [t1_name] + [step["table"] for step in join_steps]
+            else:
+                table_names = [t1_name, t2_name]
+            tables = [self._get_rows_from_source(name) for name in table_names]
+            group_by_fields = config.get("group_by_fields", []) if config else self.grouped_by_lb.get(0, tk.END)
+            fingerprint = self._query_fingerprint("join", table_names, filter_conditions_tree, output_fields,
+                                                  group_by_fields, order_by, limit, query_type,
+                                                  join_conditions, join_steps)
+            if not export_path and not explain and self._show_cached_results(fingerprint, tables):
+                return
+            results = JoinResultRows([(f"T{n}", table, self._get_all_columns(name))
+                                      for n, (name, table) in enumerate(zip(table_names, tables), 1)])
+            plan = self._new_query_plan(explain)
+            scan = self._query_scan(plan)
+            if len(join_steps) > 1:
+                joined_rows = self._chain_join_rows(tables, join_steps, filter_conditions_tree, scan)
+                if plan:
+                    joined_rows = self._explain_chain_join(plan, table_names, tables, join_steps,
+                                                           filter_conditions_tree).measure(joined_rows)
+            else:
+                joined_rows = (((i1, i2), match_count) for i1, i2, match_count in
+                               self._join_row_pairs(tables[0], tables[1], join_conditions, query_type,
+                                                    filter_conditions_tree, scan))
+                if plan:
+                    joined_rows = self._explain_join_pair(plan, table_names, tables, join_conditions, query_type,
+                                                          filter_conditions_tree).measure(joined_rows)
+            columns = list(output_fields)
+            if query_type != "ANTI" and "Match_Count" not in columns:
+                columns.insert(0, "Match_Count")
+            if group_by_fields:
+                operators = plan and self._explain_query_engine(plan, group_by_fields, output_fields, limit, order_by)
+                joined_row_numbers = (tuple(-1 if row is None else row for row in rows) for rows, _ in joined_rows)
+                result_rows = self._run_query_engine(joined_row_numbers, self._row_field_reader(tables), [],
+                                                     group_by_fields, output_fields, limit, order_by, operators)
+                if plan:
+                    self._show_query_plan(plan, result_rows)
+                    return
+                if export_path:
+                    self._start_export(export_path, list(output_fields),
+                                       ([row.get(field, "") for field in output_fields] for row in result_rows))
+                    return
+                results = []
+                self._start_query(output_fields, results, result_rows, results.append, (fingerprint, tables))
+            else:
+                operators = plan and self._explain_query_engine(plan, (), columns, limit, order_by)
+                items = self._join_result_items(joined_rows, self._row_field_reader(tables), order_by, limit,
+                                                operators)
+                if plan:
+                    # Joins build result rows only when shown, so ANALYZE times building them as export does.
+                    self._show_query_plan(plan, operators["project"].measure(
+                        self._join_export_rows(items, self._row_field_reader(tables), columns)))
+                    return
+                if export_path:
+                    self._start_export(export_path, columns,
+                                       self._join_export_rows(items, self._row_field_reader(tables), columns))
+                    return
+                self._start_query(output_fields, results, items, lambda item: results.append(*item),
+                                  (fingerprint, tables))
         except ValueError as e:
             messagebox.showerror("Query Error", f"Invalid condition logic: {e}", parent=self)
         except Exception as ex:
             messagebox.showerror("Execution Error", f"An error occurred: {ex}", parent=self)
             traceback.print_exc()
 
+    def _join_result_items(self, joined_rows, read_field, order_by, limit, operators=None):
+        """Yields the (rows, match count) of a join without GROUP BY, in ORDER BY order and up to LIMIT."""
+        if not order_by:
+            if limit == -1:
+                yield from joined_rows
+            else:
+                yield from self._measured(operators, "limit", islice, joined_rows, limit)
+            return
+        rank_readers = []
+        for field, direction in order_by:
+            if field == "Match_Count":
+                rank_readers.append((lambda item: item[1], direction))
+            else:
+                rank = read_field(field, "order")
+                rank_readers.append((lambda item, rank=rank: rank(item[0]), direction))
+        numbered_rows = ((tuple(-1 if row is None else row for row in rows), match_count)
+                         for rows, match_count in joined_rows)
+        yield from self._measured(operators, "order", self._order_rows, numbered_rows, rank_readers, limit)
+
+    def _join_export_rows(self, items, read_field, columns):
+        """Yields the values of columns for each (rows, match count) of a join, as its results grid shows them."""
+        readers = [None if column == "Match_Count" else read_field(column) for column in columns]
+        for rows, match_count in items:
+            rows = tuple(-1 if row is None else row for row in rows)
+            yield [match_count if read is None else read(rows) for read in readers]
+
+    def _join_row_pairs(self, table1, table2, join_conditions, query_type, condition_tree, scan=None):
+        """Yields (i1, i2, match_count) for an INNER, ANTI, LEFT or FULL join; i1 or i2 is None for a missing side."""
+        scan = scan or self._cancellable
+        join_plan = self._plan_join_pair(table1, table2, join_conditions, query_type, condition_tree)
+        t1_filter, t2_filter, pair_filter, unmatched1, unmatched2 = join_plan["filters"]
+        t1_fields, t2_fields = join_plan["fields"]
+        index2 = join_plan["index2"]
+        if join_plan["strategy"] == "grace":
+            yield from self._grace_join_row_pairs(
+                self._join_keys(table1, t1_fields), self._join_keys(table2, t2_fields), query_type,
+                join_plan["filters"], join_plan["partition_count"], join_plan["build_on_t2"], scan)
+            return
+
+        keys1 = self._join_keys(table1, t1_fields)
+        if join_plan["strategy"] == "filtered_t2_index":
+            # Only T2 rows passing their conditions are indexed; Match_Count still counts them all.
+            index2 = defaultdict(list)
+            for i2, join_key in enumerate(scan(self._join_keys(table2, t2_fields), "T2")):
+                if t2_filter(None, i2):
+                    index2[join_key].append(i2)
+            match_counts = dict.fromkeys(index2, 0)
+            for join_key in self._join_keys(table2, t2_fields):
+                if join_key in match_counts:
+                    match_counts[join_key] += 1
+            for i1, join_key in enumerate(scan(keys1, "T1")):
+                rows2 = index2.get(join_key)
+                if rows2 and t1_filter(i1, None):
+                    for i2 in rows2:
+                        if pair_filter(i1, i2):
+                            yield i1, i2, match_counts[join_key]
+            return
+
+        if join_plan["strategy"] == "t2_index":
+            if index2 is None:
+                index2 = table2.hash_index(t2_fields)
+            for i1, join_key in enumerate(scan(keys1, "T1")):
+                rows2 = index2.get(join_key)
+                if not rows2:
+                    if query_type != "INNER" and unmatched1(i1, None):
+                        yield i1, None, 0
+                elif query_type != "ANTI" and t1_filter(i1, None):
+                    for i2 in rows2:
+                        if t2_filter(None, i2) and pair_filter(i1, i2):
+                            yield i1, i2, len(rows2)
+            if query_type == "FULL":
+                keys_in_t1 = set(self._join_keys(table1, t1_fields))
+                for i2, join_key in enumerate(self._join_keys(table2, t2_fields)):
+                    if join_key not in keys_in_t1 and unmatched2(None, i2):
+                        yield None, i2, 0
+            return
+
+        # T1 is the smaller side: keep its candidate rows and stream T2 past their keys.
+        candidates = [(i1, join_key) for i1, join_key in enumerate(scan(keys1, "T1"))
+                      if t1_filter(i1, None)]
+        match_counts = dict.fromkeys((join_key for _, join_key in candidates), 0)
+        matched_rows2 = {}
+        for i2, join_key in enumerate(scan(self._join_keys(table2, t2_fields), "T2")):
+            if join_key in match_counts:
+                match_counts[join_key] += 1
+                if query_type != "ANTI" and t2_filter(None, i2):
+                    matched_rows2.setdefault(join_key, []).append(i2)
+        for i1, join_key in candidates:
+            if not match_counts[join_key]:
+                if query_type != "INNER" and unmatched1(i1, None):
+                    yield i1, None, 0
+                continue
+            for i2 in matched_rows2.get(join_key, ()):
+                if pair_filter(i1, i2):
+                    yield i1, i2, match_counts[join_key]
+
+    def _plan_join_pair(self, table1, table2, join_conditions, query_type, condition_tree):
+        """Returns the filters, row estimates and strategy _join_row_pairs uses for a two-table join."""
+        t1_conditions, t2_conditions, pair_conditions = [], [], []
+        for conjunct in self._split_conjuncts(condition_tree):
+            tables = self._condition_tables(conjunct)
+            if tables <= {"T1"}:
+                t1_conditions.append(conjunct)
+            elif tables == {"T2"}:
+                t2_conditions.append(conjunct)
+            else:
+                pair_conditions.append(conjunct)
+        unmatched1 = self._compile_conditions(condition_tree, table1)
+        unmatched2 = self._compile_conditions(condition_tree, None, table2)
+        if query_type == "ANTI":
+            t1_filter = unmatched1
+        else:
+            t1_filter = self._compile_conditions({'group': 'AND', 'conditions': t1_conditions}, table1)
+        t2_filter = self._compile_conditions({'group': 'AND', 'conditions': t2_conditions}, table1, table2)
+        pair_filter = self._compile_conditions({'group': 'AND', 'conditions': pair_conditions}, table1, table2)
+        t1_fields = [t1_field for t1_field, _ in join_conditions]
+        t2_fields = [t2_field for _, t2_field in join_conditions]
+
+        estimated_rows1 = len(table1) * self._sample_pass_rate(
+            t1_filter, "T1", percentile_positions(len(table1), QUERY_SELECTIVITY_SAMPLE))
+        estimated_rows2 = len(table2)
+        if query_type == "INNER":
+            estimated_rows2 *= self._sample_pass_rate(
+                t2_filter, "T2", percentile_positions(len(table2), QUERY_SELECTIVITY_SAMPLE))
+        index2 = table2.hash_index(t2_fields, build=False)
+
+        memory_budget = getattr(self.app, 'join_memory_budget_mb', JOIN_MEMORY_BUDGET_MB) * 1024 * 1024
+        partition_count = 0
+        build_on_t2 = index2 is not None or query_type == "FULL" or estimated_rows2 <= estimated_rows1
+        if index2 is None and min(estimated_rows1, estimated_rows2) * JOIN_INDEX_ENTRY_BYTES > memory_budget:
+            strategy = "grace"
+            # A T2 partition's Match_Count counts every T2 row, not only those passing their conditions.
+            build_rows = len(table2) if build_on_t2 else estimated_rows1
+            partition_count = min(JOIN_MAX_SPILL_PARTITIONS,
+                                  2 * math.ceil(build_rows * JOIN_INDEX_ENTRY_BYTES / memory_budget))
+        elif build_on_t2 and index2 is None and query_type == "INNER" and t2_conditions:
+            strategy = "filtered_t2_index"
+        else:
+            strategy = "t2_index" if build_on_t2 else "t1_candidates"
+        return {
+            "conditions": (t1_conditions, t2_conditions, pair_conditions),
+            "filters": (t1_filter, t2_filter, pair_filter, unmatched1, unmatched2),
+            "fields": (t1_fields, t2_fields), "estimated_rows": (estimated_rows1, estimated_rows2),
+            "index2": index2, "strategy": strategy, "build_on_t2": build_on_t2, "partition_count": partition_count,
+            "memory_budget": memory_budget,
+        }
+
+    def _grace_join_row_pairs(self, keys1, keys2, query_type, filters, partition_count, build_on_t2, scan):
+        """Joins via partition files on disk when the hash index would not fit in the memory budget."""
+        t1_filter, t2_filter, pair_filter, unmatched1, unmatched2 = filters
+        with tempfile.TemporaryDirectory(prefix="xmlnotepad_join_") as spill_dir:
+            if query_type == "FULL":
+                # Every T1 key is needed to tell which T2 rows have no partner.
+                paths1 = self._spill_join_partitions(spill_dir, "t1", keys1, partition_count, scan, None,
+                                                     lambda i1: t1_filter(i1, None))
+            else:
+                paths1 = self._spill_join_partitions(spill_dir, "t1", keys1, partition_count, scan,
+                                                     lambda i1: t1_filter(i1, None))
+            # T2 rows that fail their filters are still spilled: they count towards Match_Count and block ANTI rows.
+            paths2 = self._spill_join_partitions(spill_dir, "t2", keys2, partition_count, scan, None,
+                                                 lambda i2: t2_filter(None, i2))
+            for path1, path2 in zip(paths1, paths2):
+                if not build_on_t2:
+                    yield from self._join_partition_on_t1(path1, path2, query_type, filters, scan)
+                    os.remove(path1)
+                    os.remove(path2)
+                    continue
+                index2, match_counts = defaultdict(list), Counter()
+                for i2, passed, join_key in scan(self._read_join_partition(path2)):
+                    match_counts[join_key] += 1
+                    if passed:
+                        index2[join_key].append(i2)
+                keys_in_t1 = set()
+                for i1, passed, join_key in scan(self._read_join_partition(path1)):
+                    if query_type == "FULL":
+                        keys_in_t1.add(join_key)
+                    if join_key not in match_counts:
+                        if query_type != "INNER" and unmatched1(i1, None):
+                            yield i1, None, 0
+                    elif passed and query_type != "ANTI":
+                        for i2 in index2.get(join_key, ()):
+                            if pair_filter(i1, i2):
+                                yield i1, i2, match_counts[join_key]
+                if query_type == "FULL":
+                    for i2, _, join_key in self._read_join_partition(path2):
+                        if join_key not in keys_in_t1 and unmatched2(None, i2):
+                            yield None, i2, 0
+                os.remove(path1)
+                os.remove(path2)
+
+    def _join_partition_on_t1(self, path1, path2, query_type, filters, scan):
+        """Joins one grace partition pair by keeping the T1 records and streaming T2's past their keys."""
+        t1_filter, t2_filter, pair_filter, unmatched1, unmatched2 = filters
+        candidates = [(i1, join_key) for i1, _, join_key in scan(self._read_join_partition(path1))]
+        match_counts = dict.fromkeys((join_key for _, join_key in candidates), 0)
+        matched_rows2 = {}
+        for i2, passed, join_key in scan(self._read_join_partition(path2)):
+            if join_key in match_counts:
+                match_counts[join_key] += 1
+                if passed and query_type != "ANTI":
+                    matched_rows2.setdefault(join_key, []).append(i2)
+        for i1, join_key in candidates:
+            if not match_counts[join_key]:
+                if query_type != "INNER" and unmatched1(i1, None):
+                    yield i1, None, 0
+                continue
+            for i2 in matched_rows2.get(join_key, ()):
+                if pair_filter(i1, i2):
+                    yield i1, i2, match_counts[join_key]
+
+    def _chain_join_rows(self, tables, join_steps, condition_tree, scan=None):
+        """Joins T1..TN left to right for SQL queries over more than two tables."""
+        scan = scan or self._cancellable
+        pushed_conditions, remaining_conditions = self._chain_join_pushdown(len(tables), join_steps, condition_tree)
+        row_filters = {}
+        for alias, conjuncts in pushed_conditions.items():
+            test = self._compile_conditions({'group': 'AND', 'conditions': conjuncts}, *tables)
+            before, after = (None,) * (int(alias[1:]) - 1), (None,) * (len(tables) - int(alias[1:]))
+            row_filters[alias] = lambda row, test=test, before=before, after=after: test(*before, row, *after)
+
+        t1_filter = row_filters.get("T1")
+        joined = [array('q', (i for i in scan(range(len(tables[0])), "T1")
+                              if t1_filter is None or t1_filter(i)))]
+        match_counts = array('I', bytes(4 * len(joined[0])))
+        for n, step in enumerate(join_steps, 2):
+            table, query_type = tables[n - 1], step["query_type"]
+            index = table.hash_index([field for _, _, field in step["conditions"]])
+            probes = [(int(alias[1:]) - 1, tables[int(alias[1:]) - 1].column_values(field))
+                      for alias, field, _ in step["conditions"]]
+            row_filter = row_filters.get(f"T{n}")
+            next_joined, match_counts = [array('q') for _ in range(n)], array('I')
+            matched_rows = set()
+            for r in scan(range(len(joined[0]))):
+                rows = ()
+                if all(joined[position][r] >= 0 for position, _ in probes):
+                    key_parts = [values[joined[position][r]] for position, values in probes]
+                    rows = index.get(key_parts[0] if len(key_parts) == 1 else tuple(key_parts), ())
+                if query_type == "FULL":
+                    matched_rows.update(rows)
+                if query_type == "ANTI":
+                    new_rows = () if rows else (-1,)
+                elif rows:
+                    new_rows = rows if row_filter is None else [row for row in rows if row_filter(row)]
+                else:
+                    new_rows = (-1,) if query_type in ("LEFT", "FULL") else ()
+                for new_row in new_rows:
+                    for position in range(n - 1):
+                        next_joined[position].append(joined[position][r])
+                    next_joined[n - 1].append(new_row)
+                    match_counts.append(len(rows))
+            if query_type == "FULL":
+                for row in range(len(table)):
+                    if row not in matched_rows:
+                        for position in range(n - 1):
+                            next_joined[position].append(-1)
+                        next_joined[n - 1].append(row)
+                        match_counts.append(0)
+            joined = next_joined
+
+        matches = self._compile_conditions({'group': 'AND', 'conditions': remaining_conditions}, *tables,
+                                           nullable=True)
+        for r in scan(range(len(match_counts))):
+            rows = tuple(column[r] for column in joined)
+            if matches(*rows):
+                yield rows, match_counts[r]
+
+    def _chain_join_pushdown(self, table_count, join_steps, condition_tree):
+        """Splits a chain join's WHERE into ({alias: conjuncts applied to that table's rows}, conjuncts left)."""
+        aliases = [f"T{n}" for n in range(1, table_count + 1)]
+        # A table's own conditions run before the join unless an outer join may leave its row missing.
+        optional_aliases = set()
+        for n, step in enumerate(join_steps, 2):
+            if step["query_type"] in ("LEFT", "ANTI"):
+                optional_aliases.add(f"T{n}")
+            elif step["query_type"] == "FULL":
+                optional_aliases.update(aliases[:n])
+        pushed_conditions, remaining_conditions = defaultdict(list), []
+        for conjunct in self._split_conjuncts(condition_tree):
+            condition_tables = self._condition_tables(conjunct)
+            if len(condition_tables) == 1 and condition_tables <= set(aliases) - optional_aliases:
+                pushed_conditions[condition_tables.pop()].append(conjunct)
+            else:
+                remaining_conditions.append(conjunct)
+        return pushed_conditions, remaining_conditions
+
+    def _spill_join_partitions(self, spill_dir, prefix, join_keys, partition_count, scan, row_filter=None,
+                               flag=None):
+        paths = [os.path.join(spill_dir, f"{prefix}_{p}.csv") for p in range(partition_count)]
+        files = [open(path, 'w', newline='', encoding='utf-8') for path in paths]
+        try:
+            writers = [csv.writer(f) for f in files]
+            for row, join_key in enumerate(scan(join_keys, prefix.upper())):
+                if row_filter is not None and not row_filter(row):
+                    continue
+                key_parts = join_key if isinstance(join_key, tuple) else (join_key,)
+                partition = zlib.crc32("\x00".join(key_parts).encode('utf-8')) % partition_count
+                writers[partition].writerow((row, 1 if flag is None or flag(row) else 0) + key_parts)
+        finally:
+            for f in files:
+                f.close()
+        return paths
+
+    def _read_join_partition(self, path):
+        with open(path, newline='', encoding='utf-8') as f:
+            for record in csv.reader(f):
+                join_key = record[2] if len(record) == 3 else tuple(record[2:])
+                yield int(record[0]), record[1] == "1", join_key
+
+    def _join_keys(self, table, fields):
+        """Join key of every row: the value itself for a single field, otherwise a tuple."""
+        if len(fields) == 1:
+            return table.column_values(fields[0])
+        return zip(*[table.column_values(field) for field in fields])
+
     def _create_simple_query_widgets(self, parent):
         parent.columnconfigure(0, weight=1)
         parent.rowconfigure(2, weight=1)
@@ -1975,6 +3899,28 @@ class QueryDesigner(tk.Toplevel):
         self.query_view_text.config(yscrollcommand=query_sb.set)
         self.query_view_text.bind("<KeyRelease>", self._on_key_release)
 
+    def _create_query_plan_widgets(self, parent):
+        parent.rowconfigure(1, weight=1)
+        parent.columnconfigure(0, weight=1)
+        plan_actions = ttk.Frame(parent)
+        plan_actions.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        ttk.Button(plan_actions, text="Explain", command=lambda: self._explain_query(False),
+                   style="Accent.TButton").pack(side=tk.LEFT)
+        ttk.Button(plan_actions, text="Explain Analyze", command=lambda: self._explain_query(True)).pack(
+            side=tk.LEFT, padx=10)
+        ttk.Checkbutton(plan_actions, text="Trace Memory", variable=self.plan_trace_memory_var).pack(
+            side=tk.LEFT, padx=(0, 10))
+        ttk.Label(plan_actions, text="Shows how the SQL View's query runs; Analyze also runs it and measures "
+                                     "each step.", font=("Segoe UI", 9, "italic"), foreground="gray").pack(side=tk.LEFT)
+
+        self.query_plan_text = tk.Text(parent, wrap=tk.NONE, state="disabled", font=("Courier New", 10))
+        self.query_plan_text.grid(row=1, column=0, sticky="nsew")
+        plan_vsb = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.query_plan_text.yview)
+        plan_vsb.grid(row=1, column=1, sticky="ns")
+        plan_hsb = ttk.Scrollbar(parent, orient=tk.HORIZONTAL, command=self.query_plan_text.xview)
+        plan_hsb.grid(row=2, column=0, sticky="ew")
+        self.query_plan_text.config(yscrollcommand=plan_vsb.set, xscrollcommand=plan_hsb.set)
+
     def _create_results_widgets(self, parent):
         parent.rowconfigure(1, weight=1)
         parent.columnconfigure(0, weight=1)
@@ -1989,17 +3935,30 @@ class QueryDesigner(tk.Toplevel):
         self.join_type_rb_anti = ttk.Radiobutton(options_frame, text="Left Anti-Join", variable=self.query_type_var,
                                                  value="ANTI")
         self.join_type_rb_anti.pack(side=tk.LEFT, padx=5)
+        self.join_type_rb_left = ttk.Radiobutton(options_frame, text="Left Outer Join", variable=self.query_type_var,
+                                                 value="LEFT")
+        self.join_type_rb_left.pack(side=tk.LEFT, padx=5)
+        self.join_type_rb_full = ttk.Radiobutton(options_frame, text="Full Outer Join", variable=self.query_type_var,
+                                                 value="FULL")
+        self.join_type_rb_full.pack(side=tk.LEFT, padx=5)
         ttk.Checkbutton(options_frame, text="Limit:", variable=self.limit_enabled_var,
                         command=self._toggle_limit_entry).pack(side=tk.LEFT, padx=(15, 0))
         self.limit_spinbox = ttk.Spinbox(action_frame, from_=1, to=1000000, textvariable=self.limit_value_var, width=8,
                                          state="disabled")
         self.limit_spinbox.pack(side=tk.LEFT)
+        ttk.Label(action_frame, text="Order By:").pack(side=tk.LEFT, padx=(15, 2))
+        self.order_by_combo = ttk.Combobox(action_frame, textvariable=self.order_by_var, width=28,
+                                           postcommand=self._refresh_order_by_choices)
+        self.order_by_combo.pack(side=tk.LEFT)
 
         action_button_frame = ttk.Frame(action_frame)
         action_button_frame.pack(side=tk.RIGHT)
         self.run_designer_button = ttk.Button(action_button_frame, text="Run Designer Query",
                                               command=self._run_designer_query, style="Accent.TButton")
         self.run_designer_button.pack(side=tk.LEFT, padx=10)
+        self.cancel_query_button = ttk.Button(action_button_frame, text="Cancel", command=self._cancel_query,
+                                              state="disabled")
+        self.cancel_query_button.pack(side=tk.LEFT)
         ttk.Style().configure("Accent.TButton", font=("Segoe UI", 10, "bold"))
 
         results_grid_frame = ttk.Labelframe(parent, text="Results", padding=10)
@@ -2018,14 +3977,24 @@ class QueryDesigner(tk.Toplevel):
         self.goto_row_entry.bind("<Return>", self._go_to_row)
         ttk.Button(nav_frame, text="Next", command=self._go_to_next_selected).pack(side=tk.LEFT, padx=2)
 
-        self.results_tree = ttk.Treeview(results_grid_frame, show='headings', selectmode='extended')
-        results_vsb = ttk.Scrollbar(results_grid_frame, orient="vertical", command=self.results_tree.yview)
+        self.results_tree = ttk.Treeview(results_grid_frame, show='headings', selectmode='none')
+        self.results_vsb = ttk.Scrollbar(results_grid_frame, orient="vertical", command=self._on_results_scroll)
         results_hsb = ttk.Scrollbar(results_grid_frame, orient="horizontal", command=self.results_tree.xview)
-        self.results_tree.configure(yscrollcommand=results_vsb.set, xscrollcommand=results_hsb.set)
+        self.results_tree.configure(xscrollcommand=results_hsb.set)
         results_hsb.pack(side='bottom', fill='x')
-        results_vsb.pack(side='right', fill='y')
+        self.results_vsb.pack(side='right', fill='y')
         self.results_tree.pack(fill='both', expand=True)
 
+        self.results_tree.tag_configure('selected', background='#e6f3ff')
+        self.results_tree.bind("<Configure>", self._on_results_resize)
+        self.results_tree.bind("<MouseWheel>", self._on_results_mouse_wheel)
+        self.results_tree.bind("<Button-4>", self._on_results_mouse_wheel)
+        self.results_tree.bind("<Button-5>", self._on_results_mouse_wheel)
+        self.results_tree.bind("<Prior>", lambda e: self._on_results_scroll("scroll", -1, "pages") or "break")
+        self.results_tree.bind("<Next>", lambda e: self._on_results_scroll("scroll", 1, "pages") or "break")
+        self.results_tree.bind("<Up>", lambda e: self._move_results_selection(-1))
+        self.results_tree.bind("<Down>", lambda e: self._move_results_selection(1))
+
     def _on_tab_change(self, event):
         is_visual_tab = self.config_notebook.tab(self.config_notebook.select(), "text") == "Visual Designer"
         is_sql_tab = self.config_notebook.tab(self.config_notebook.select(), "text") == "SQL View"
@@ -2036,66 +4005,6 @@ class QueryDesigner(tk.Toplevel):
         else:
             self.run_designer_button.config(text="Run Designer Query", command=self._run_designer_query)
 
-    def _row_matches_simple_filters(self, row_element, filters):
-        if not filters: return True
-        for f in filters:
-            field, op, value = f['field'], f['op'], f['value']
-            is_date_func = isinstance(field, tuple)
-
-            if is_date_func:
-                func, col_name = field
-                cell_value = self._get_cell_value(row_element, col_name)
-                try:
-                    dt_obj = None
-                    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%m/%d/%Y", "%d-%b-%y"):
-                        try:
-                            dt_obj = datetime.strptime(cell_value, fmt)
-                            break
-                        except ValueError:
-                            continue
-                    if not dt_obj: raise ValueError("Date format not recognized")
-
-                    cell_part = getattr(dt_obj, func)
-                    value_num = int(value)
-
-                    op_map = {'=': cell_part == value_num, '!=': cell_part != value_num, '>': cell_part > value_num,
-                              '<': cell_part < value_num, '>=': cell_part >= value_num, '<=': cell_part <= value_num}
-                    match = op_map.get(op, False)
-                except (ValueError, TypeError):
-                    match = False
-            else:
-                cell_value = self._get_cell_value(row_element, field)
-                cell_compare, value_compare = cell_value.lower(), value.lower()
-                match = False
-                if op == "CONTAINS":
-                    match = value_compare in cell_compare
-                elif op == "NOT CONTAINS":
-                    match = value_compare not in cell_compare
-                elif op == "STARTS WITH":
-                    match = cell_compare.startswith(value_compare)
-                elif op == "ENDS WITH":
-                    match = cell_compare.endswith(value_compare)
-                elif op == "=":
-                    match = cell_compare == value_compare
-                elif op == "!=":
-                    match = cell_compare != value_compare
-                else:
-                    try:
-                        cell_num, val_num = float(cell_value), float(value)
-                        if op == ">":
-                            match = cell_num > val_num
-                        elif op == "<":
-                            match = cell_num < val_num
-                        elif op == ">=":
-                            match = cell_num >= val_num
-                        elif op == "<=":
-                            match = cell_num <= val_num
-                    except (ValueError, TypeError):
-                        pass
-
-            if not match: return False
-        return True
-
     def _validate_and_run_simple_query(self):
         self.simple_query_text.tag_remove("error", "1.0", tk.END)
         self.simple_query_status_label.config(text="Validating...", foreground="orange")
@@ -2124,21 +4033,19 @@ class QueryDesigner(tk.Toplevel):
         self.update_idletasks()
 
         try:
-            rows = self._get_rows_from_source(table_name)
+            self._begin_query()
+            table = self._get_rows_from_source(table_name)
             results = []
 
-            for row in rows:
-                if self._row_matches_simple_filters(row, parsed['conditions']):
-                    result_row = {}
-                    display_fields = parsed['fields']
-                    if display_fields == ['*']:
-                        display_fields = valid_columns
-                    for field in display_fields:
-                        result_row[field] = self._get_cell_value(row, field)
-                    results.append(result_row)
-
-            if self.limit_enabled_var.get():
-                results = results[:self.limit_value_var.get()]
+            matches = self._compile_conditions(self._simple_filters_to_tree(parsed['conditions']), table)
+            display_fields = parsed['fields'] if parsed['fields'] != ['*'] else valid_columns
+            output_columns = [(field, table.column_values(field)) for field in display_fields]
+            limit = self.limit_value_var.get() if self.limit_enabled_var.get() else -1
+            for i in range(len(table)):
+                if matches(i, None):
+                    results.append({field: values[i] for field, values in output_columns})
+                    if len(results) == limit:
+                        break
 
             self.current_results_data = results
             final_fields = parsed['fields'] if parsed['fields'] != ['*'] else valid_columns
@@ -2211,6 +4118,14 @@ class QueryDesigner(tk.Toplevel):
                     self.available_fields_lb.delete(idx)
                 except ValueError:
                     pass
+        available_group_fields = list(self.group_available_lb.get(0, tk.END))
+        for field in visual_config.get("group_by_fields", []):
+            if field in available_group_fields:
+                self.grouped_by_lb.insert(tk.END, field)
+                self.group_available_lb.delete(available_group_fields.index(field))
+                available_group_fields.remove(field)
+        self.order_by_var.set(", ".join(f"{field} {direction}"
+                                        for field, direction in visual_config.get("order_by", [])))
 
         self.limit_enabled_var.set(config.get("limit_enabled", False))
         self.limit_value_var.set(config.get("limit_value", 100))
@@ -2228,7 +4143,9 @@ class QueryDesigner(tk.Toplevel):
             "table2": self.table2_var.get(),
             "query_type": self.query_type_var.get(),
             "conditions_list": self.visual_conditions,
-            "output_fields": list(self.selected_fields_lb.get(0, tk.END))
+            "output_fields": list(self.selected_fields_lb.get(0, tk.END)),
+            "group_by_fields": list(self.grouped_by_lb.get(0, tk.END)),
+            "order_by": self._parse_order_by_list(self.order_by_var.get())
         }
 
         simple_query_config = {
@@ -2296,7 +4213,7 @@ class QueryDesigner(tk.Toplevel):
             messagebox.showerror("Load Error", f"Failed to load or apply configuration:\n{e}", parent=self)
             traceback.print_exc()
 
-    def _run_designer_query(self):
+    def _run_designer_query(self, export_path=None, explain=None):
         t1_name = self.table1_var.get()
         if not t1_name:
             messagebox.showerror("Error", "Please select a table (T1).", parent=self)
@@ -2306,20 +4223,24 @@ class QueryDesigner(tk.Toplevel):
             return
 
         if self.table2_var.get():
-            self._run_join_query()
+            self._run_join_query(export_path=export_path, explain=explain)
         else:
-            self._run_filter_query()
+            self._run_filter_query(export_path=export_path, explain=explain)
 
-    def _run_sql_from_view(self):
+    def _run_sql_from_view(self, export_path=None, explain=None):
+        if not self.manual_edit_mode.get():
+            # The view shows the designer's own query, which can hold OR/NOT groups the SQL parser reads as ANDs.
+            self._run_designer_query(export_path, explain)
+            return
         query_text = self.query_view_text.get("1.0", tk.END)
         config = None
         try:
-            if re.search(r"\s+(INNER|LEFT\s+ANTI)(?:\s+JOIN)?\s+", query_text, re.I):
+            if self._is_join_query(query_text):
                 config = self._parse_join_query(query_text)
-                self._run_join_query(config)
+                self._run_join_query(config, export_path, explain)
             elif re.search(r"\s+FROM\s+", query_text, re.I):
                 config = self._parse_filter_query(query_text)
-                self._run_filter_query(config)
+                self._run_filter_query(config, export_path, explain)
             else:
                 raise ValueError("Invalid SQL. Must contain at least a SELECT and FROM clause.")
         except ValueError as e:
@@ -2329,24 +4250,21 @@ class QueryDesigner(tk.Toplevel):
             messagebox.showerror("Unexpected Error", error_details, parent=self)
 
     def _display_results_grid(self, output_fields):
-        selected_iids = self.results_tree.selection()
-
-        self.results_tree.delete(*self.results_tree.get_children())
-
         display_columns = list(output_fields)
         is_join = self.table1_var.get() and self.table2_var.get()
-        if is_join and self.query_type_var.get() == "INNER" and "Match_Count" not in display_columns:
+        if is_join and self.query_type_var.get() != "ANTI" and "Match_Count" not in display_columns:
             display_columns.insert(0, "Match_Count")
 
+        self.results_columns = display_columns
         self.results_tree["columns"] = display_columns
         for col in display_columns:
             self.results_tree.heading(col, text=col, anchor='w')
             self.results_tree.column(col, width=120, anchor='w', stretch=True)
-
         if "Match_Count" in display_columns:
             self.results_tree.column("Match_Count", width=80, anchor='center', stretch=False)
 
         self.results_sort_col = None
+        self.results_selected_index = None
         self._sort_and_redisplay_results()
 
         if not self.current_results_data:
@@ -2354,73 +4272,175 @@ class QueryDesigner(tk.Toplevel):
         else:
             self.results_status_label.config(text=f"{len(self.current_results_data)} records found.")
 
-        final_selection = [iid for iid in selected_iids if self.results_tree.exists(iid)]
-        if final_selection:
-            self.results_tree.selection_set(final_selection)
-            self.results_tree.focus(final_selection[0])
-            self.results_tree.see(final_selection[0])
-
     def _sort_and_redisplay_results(self):
-        selected_iids = self.results_tree.selection()
-
-        def sort_key(item_tuple):
-            item = item_tuple[1]
-            value = item.get(self.results_sort_col)
-            if value is None:
-                return -float('inf') if self.results_sort_asc else float('inf')
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return str(value).lower()
-
-        indexed_data = list(enumerate(self.current_results_data))
+        """Re-orders the display positions (not the results themselves) and repaints the visible window."""
+        selected_position = None
+        if self.results_selected_index is not None:
+            selected_position = self.results_view_rows[self.results_selected_index]
 
         if self.results_sort_col:
-            indexed_data.sort(key=sort_key, reverse=not self.results_sort_asc)
+            # Rank the column once so the sort compares integers instead of re-parsing values per comparison.
+            ranks = result_sort_ranks(self._results_column_values(self.results_sort_col))
+            self.results_view_rows = sorted(range(len(ranks)), key=ranks.__getitem__, reverse=not self.results_sort_asc)
+        else:
+            self.results_view_rows = range(len(self.current_results_data))
 
         self._update_results_header_style()
-        self.results_tree.delete(*self.results_tree.get_children())
+        self.results_top_index = 0
+        self.results_selected_index = None
+        if selected_position is not None:
+            self._jump_to_results_row(self.results_view_rows.index(selected_position))
+        else:
+            self._repopulate_results_window()
+            self._update_results_scrollbar()
+
+    def _results_column_values(self, column):
+        if isinstance(self.current_results_data, JoinResultRows):
+            return self.current_results_data.column_values(column)
+        return [result_row.get(column) for result_row in self.current_results_data]
+
+    def _results_row_values(self, view_index):
+        result_row = self.current_results_data[self.results_view_rows[view_index]]
+        return [result_row.get(col, "") for col in self.results_columns]
+
+    def _repopulate_results_window(self):
+        """Shows the current window of results by rewriting a fixed pool of Treeview items in place."""
+        tree = self.results_tree
+        if self._results_repaint_after_id is not None:
+            self.after_cancel(self._results_repaint_after_id)
+            self._results_repaint_after_id = None
+        start_index = self.results_top_index
+        window_size = max(0, min(self.results_window_rows, len(self.results_view_rows) - start_index))
+
+        while len(self._results_row_items) < window_size:
+            self._results_row_items.append(tree.insert("", "end"))
+            self._results_attached_count += 1
+        for position in range(self._results_attached_count, window_size):
+            tree.move(self._results_row_items[position], "", position)
+        if window_size < self._results_attached_count:
+            tree.detach(*self._results_row_items[window_size:self._results_attached_count])
+        self._results_attached_count = window_size
+
+        for i in range(window_size):
+            view_index = start_index + i
+            tree.item(self._results_row_items[i], values=self._results_row_values(view_index),
+                      tags=self._results_row_tags(view_index))
+
+    def _results_row_tags(self, view_index):
+        if self.results_selected_index == view_index:
+            return (str(view_index), 'selected')
+        return (str(view_index),)
+
+    def _results_item_for_view_index(self, view_index):
+        """Returns the pooled item showing view_index, or None if that row is outside the window."""
+        position = view_index - self.results_top_index if view_index is not None else -1
+        return self._results_row_items[position] if 0 <= position < self._results_attached_count else None
+
+    def _update_results_scrollbar(self):
+        total_rows = len(self.results_view_rows)
+        if total_rows <= self.results_window_rows:
+            self.results_vsb.set(0, 1)
+        else:
+            upper = self.results_top_index / total_rows
+            lower = (self.results_top_index + self.results_window_rows) / total_rows
+            self.results_vsb.set(upper, lower)
+
+    def _on_results_scroll(self, action, value, units=None):
+        total_rows = len(self.results_view_rows)
+        if total_rows <= self.results_window_rows: return
+
+        max_top_index = total_rows - self.results_window_rows
+        if action == "moveto":
+            new_top_index = int(float(value) * total_rows)
+        elif action == "scroll":
+            if units == "pages":
+                new_top_index = self.results_top_index + (int(value) * self.results_window_rows)
+            else:
+                new_top_index = self.results_top_index + int(value)
+        else:
+            return
 
-        for original_index, result_row in indexed_data:
-            iid = f"row_{original_index}"
-            values = [result_row.get(col, "") for col in self.results_tree["columns"]]
-            self.results_tree.insert("", "end", iid=iid, values=values)
+        new_top_index = max(0, min(new_top_index, max_top_index))
+        if new_top_index != self.results_top_index:
+            self.results_top_index = new_top_index
+            self._update_results_scrollbar()
+            # One repaint per burst of scroll events, as in TableViewTab.
+            if self._results_repaint_after_id is None:
+                self._results_repaint_after_id = self.after(SCROLL_REPAINT_DELAY_MS, self._repopulate_results_window)
+
+    def _on_results_mouse_wheel(self, event):
+        self._on_results_scroll("scroll", wheel_scroll_steps(event) * WHEEL_SCROLL_ROWS, "units")
+        return "break"
 
-        if selected_iids:
-            self.results_tree.selection_set(selected_iids)
+    def _on_results_resize(self, event):
+        first_item = self._results_row_items[0] if self._results_attached_count else None
+        window_rows = tree_window_row_count(self.results_tree, event.height, first_item)
+        if window_rows == self.results_window_rows:
+            return
+        self.results_window_rows = window_rows
+        total_rows = len(self.results_view_rows)
+        self.results_top_index = max(0, min(self.results_top_index, total_rows - window_rows))
+        self._update_results_scrollbar()
+        self._repopulate_results_window()
+
+    def _select_results_row(self, view_index):
+        previous_index, self.results_selected_index = self.results_selected_index, view_index
+        for index in (previous_index, view_index):
+            item_id = self._results_item_for_view_index(index)
+            if item_id is not None:
+                self.results_tree.item(item_id, tags=self._results_row_tags(index))
+
+    def _jump_to_results_row(self, view_index):
+        total_rows = len(self.results_view_rows)
+        if not (0 <= view_index < total_rows): return
+        if not self.results_top_index <= view_index < self.results_top_index + self.results_window_rows:
+            self.results_top_index = max(0, min(view_index, total_rows - self.results_window_rows))
+        self.results_selected_index = view_index
+        self._repopulate_results_window()
+        self._update_results_scrollbar()
+
+        item_id = self._results_item_for_view_index(view_index)
+        if item_id is not None:
+            self.results_tree.see(item_id)
+            self.results_tree.focus(item_id)
+
+    def _move_results_selection(self, step):
+        """Moves the selected result by step, scrolling the window only as far as needed to keep it in view."""
+        total_rows = len(self.results_view_rows)
+        if total_rows == 0:
+            return "break"
+        if self.results_selected_index is None:
+            target_index = self.results_top_index
+        else:
+            target_index = max(0, min(self.results_selected_index + step, total_rows - 1))
+        if target_index < self.results_top_index:
+            self._on_results_scroll("scroll", target_index - self.results_top_index, "units")
+        elif target_index >= self.results_top_index + self.results_window_rows:
+            self._on_results_scroll("scroll", target_index - self.results_top_index - self.results_window_rows + 1,
+                                    "units")
+        if self._results_repaint_after_id is not None:
+            self._repopulate_results_window()  # A key press moves one row at a time: paint it now, not after the delay
+        self._select_results_row(target_index)
+        return "break"
 
     def _go_to_row(self, event=None):
         try:
             row_num_str = self.goto_row_var.get()
             if not row_num_str: return
             row_num = int(row_num_str)
-            children = self.results_tree.get_children()
-            if 1 <= row_num <= len(children):
-                target_iid = children[row_num - 1]
-                self.results_tree.selection_set(target_iid)
-                self.results_tree.focus(target_iid)
-                self.results_tree.see(target_iid)
+            total_rows = len(self.results_view_rows)
+            if 1 <= row_num <= total_rows:
+                self._jump_to_results_row(row_num - 1)
             else:
-                messagebox.showwarning("Invalid Row", f"Please enter a row number between 1 and {len(children)}.",
+                messagebox.showwarning("Invalid Row", f"Please enter a row number between 1 and {total_rows}.",
                                        parent=self)
         except (ValueError, IndexError):
             messagebox.showwarning("Invalid Row", "Please enter a valid row number.", parent=self)
 
     def _go_to_next_selected(self):
-        selection = self.results_tree.selection()
-        if not selection: return
-
-        children = self.results_tree.get_children()
-        try:
-            last_selected_iid = selection[-1]
-            current_index = children.index(last_selected_iid)
-            if current_index + 1 < len(children):
-                next_iid = children[current_index + 1]
-                self.results_tree.selection_set(next_iid)
-                self.results_tree.focus(next_iid)
-                self.results_tree.see(next_iid)
-        except ValueError:
-            pass
+        if self.results_selected_index is None: return
+        if self.results_selected_index + 1 < len(self.results_view_rows):
+            self._jump_to_results_row(self.results_selected_index + 1)
 
     def _populate_initial_dropdowns(self):
         self.table1_combo['values'] = self.table_names
@@ -2451,65 +4471,511 @@ class QueryDesigner(tk.Toplevel):
             self.selected_fields_lb.delete(i)
         self._update_query_view()
 
-    def _run_query_engine(self, base_results):
-        group_by_fields = self.grouped_by_lb.get(0, tk.END)
-        output_fields = self.selected_fields_lb.get(0, tk.END)
-
+    def _run_query_engine(self, rows, read_field, base_fields, group_by_fields, output_fields, limit, order_by=(),
+                          operators=None):
+        """Turns the rows from the filter/join stage into result dicts, grouped, ordered and limited."""
         if not group_by_fields:
-            limit = self.limit_value_var.get() if self.limit_enabled_var.get() else -1
-            if limit != -1:
-                return base_results[:limit]
-            return base_results
+            if order_by:
+                rows = self._measured(operators, "order", self._order_fields, rows, read_field, order_by, limit)
+            elif limit != -1:
+                rows = self._measured(operators, "limit", islice, rows, limit)
+            yield from self._measured(operators, "project", self._project_rows, rows, read_field, base_fields)
+            return
 
-        grouped_data = defaultdict(list)
-        for row in base_results:
-            key = tuple(row.get(field, "") for field in group_by_fields)
-            grouped_data[key].append(row)
+        aggregated_results = self._measured(operators, "aggregate", self._aggregate_rows, rows, read_field,
+                                            group_by_fields, output_fields)
+        if operators:
+            aggregated_results = list(aggregated_results)
+        if order_by:
+            rank_readers = []
+            for field, direction in order_by:
+                if aggregated_results and field not in aggregated_results[0]:
+                    raise ValueError(f"ORDER BY field '{field}' must be a GROUP BY field or an aggregate "
+                                     f"in the output.")
+                ranks = result_sort_ranks([agg_row.get(field) for agg_row in aggregated_results])
+                rank_readers.append((ranks.__getitem__, direction))
+            yield from (aggregated_results[i] for i in self._measured(
+                operators, "order", self._order_rows, range(len(aggregated_results)), rank_readers, limit))
+        elif limit != -1:
+            yield from self._measured(operators, "limit", islice, aggregated_results, limit)
+        else:
+            yield from aggregated_results
+
+    def _order_fields(self, rows, read_field, order_by, limit):
+        rank_readers = [(read_field(field, "order"), direction) for field, direction in order_by]
+        return self._order_rows(rows, rank_readers, limit)
+
+    def _project_rows(self, rows, read_field, fields):
+        readers = [(field, read_field(field)) for field in fields]
+        for row in rows:
+            yield {field: read(row) for field, read in readers}
+
+    @staticmethod
+    def _measured(operators, stage, build, *args):
+        """Returns build(*args), built inside its plan step under EXPLAIN ANALYZE so its time is counted."""
+        step = operators.get(stage) if operators else None
+        if step is None:
+            return build(*args)
+
+        def deferred():
+            yield from build(*args)
+        return step.measure(deferred())
+
+    def _begin_query(self):
+        """Cancels a query still running and gives the next one its own cancel flag (see _cancellable)."""
+        if self._query_run is not None:
+            self._query_run["cancel"].set()
+            self._query_run = None
+        self._query_cancel_event = threading.Event()
+
+    def _query_scan(self, plan=None):
+        """Returns scan(iterable, source=None), _cancellable bound to this query's cancel flag and plan."""
+        # Read the flag now: scans start on the worker thread, when a newer query may have replaced it.
+        cancel_event = self._query_cancel_event
+
+        def scan(iterable, source=None):
+            return self._cancellable(iterable, source, cancel_event, plan)
+        return scan
+
+    @staticmethod
+    def _cancellable(iterable, source=None, cancel_event=None, plan=None):
+        """Passes iterable through in chunks, raising QueryCancelled between chunks once cancel_event is set."""
+        if cancel_event is None:
+            return iterable
+        scanned_rows = plan.scanned_rows if plan is not None and plan.analyze and source else None
+
+        def chunks(iterator):
+            while not cancel_event.is_set():
+                chunk = list(islice(iterator, QUERY_CANCEL_CHECK_ROWS))
+                if not chunk:
+                    return
+                yield chunk
+            raise QueryCancelled()
+        rows = chain.from_iterable(chunks(iter(iterable)))
+        if scanned_rows is None:
+            return rows
+
+        def counted(rows):
+            # Counted as rows are passed on rather than per chunk read ahead, so a LIMIT shows the rows it used.
+            for row in rows:
+                scanned_rows[source] += 1
+                yield row
+        return counted(rows)
+
+    def _query_fingerprint(self, mode, table_names, condition_tree, output_fields, group_by_fields, order_by, limit,
+                           *join_details):
+        """Text key identifying a query for the result cache, the same whether built in the designer or SQL view."""
+        return json.dumps([mode, list(table_names), normalized_condition_tree(condition_tree), list(output_fields),
+                           list(group_by_fields), [list(order) for order in order_by], int(limit), join_details],
+                          sort_keys=True, default=str)
+
+    def _show_cached_results(self, fingerprint, tables):
+        """Shows the cached results of an unchanged query, returning False when there are none."""
+        cache = getattr(self.app, 'query_result_cache', None)
+        cached = cache.get(fingerprint, tables) if cache is not None else None
+        if cached is None:
+            return False
+        output_fields, results = cached
+        self.cancel_query_button.config(state="disabled")
+        self.current_results_data = results
+        self._display_results_grid(output_fields)
+        if results:
+            self.results_status_label.config(text=f"{len(results)} records found (cached).")
+        return True
 
-        aggregated_results = []
-        for key, rows in grouped_data.items():
-            agg_row = {}
-            for i, field in enumerate(group_by_fields):
-                agg_row[field] = key[i]
+    def _start_query(self, output_fields, results, items, add, cache_key=None):
+        """Runs a query's row pipeline on a worker thread, showing the rows found so far until it finishes."""
+        run = {"cancel": self._query_cancel_event, "done": False, "error": None, "cache": None}
+        if cache_key is not None:
+            fingerprint, tables = cache_key
+            run["cache"] = (fingerprint, QueryResultCache.table_snapshots(tables), list(output_fields))
+        self._query_run = run
+        self.current_results_data = results
+        self._display_results_grid(output_fields)
+        self.results_status_label.config(text="Running query...")
+        self.cancel_query_button.config(state="normal")
+        threading.Thread(target=self._query_worker, args=(run, items, add), daemon=True).start()
+        self.after(QUERY_PUBLISH_INTERVAL_MS, self._publish_query_results, run, results)
+
+    def _query_worker(self, run, items, add):
+        # Never touches Tk: the results grid polls run and results from the main thread.
+        try:
+            for item in items:
+                add(item)
+        except QueryCancelled:
+            pass
+        except ValueError as e:
+            run["error"] = e
+        except Exception as ex:
+            run["error"] = ex
+            traceback.print_exc()
+        run["done"] = True
 
-            for out_field in output_fields:
-                if out_field in agg_row:
-                    continue
+    def _publish_query_results(self, run, results):
+        if run is not self._query_run:
+            return
+        if not self.winfo_exists():
+            run["cancel"].set()  # The designer was closed while the query ran
+            return
+        # Rows below len(results) are complete: the worker appends a row's fields before counting it.
+        found_rows = len(results)
+        if found_rows != len(self.results_view_rows):
+            shown_rows = len(self.results_view_rows)
+            self.results_view_rows = range(found_rows)
+            if shown_rows < self.results_top_index + self.results_window_rows:
+                self._repopulate_results_window()
+            self._update_results_scrollbar()
+        if not run["done"]:
+            self.results_status_label.config(text=f"Running query... {found_rows:,} rows found.")
+            self.after(QUERY_PUBLISH_INTERVAL_MS, self._publish_query_results, run, results)
+            return
 
-                match = re.match(r"(\w+)\((.+)\)", out_field)
-                if not match:
-                    agg_row[out_field] = "N/A (Non-aggregated field in GROUP BY query)"
-                    continue
+        self._query_run = None
+        self.cancel_query_button.config(state="disabled")
+        if run["cancel"].is_set():
+            self.results_status_label.config(text=f"Query cancelled. Showing the {found_rows:,} rows found so far.")
+        elif not found_rows:
+            self.results_status_label.config(text="No results.")
+        else:
+            self.results_status_label.config(text=f"{found_rows} records found.")
+        error = run["error"]
+        cache = getattr(self.app, 'query_result_cache', None)
+        if cache is not None and run["cache"] is not None and error is None and not run["cancel"].is_set():
+            fingerprint, snapshots, output_fields = run["cache"]
+            cache.put(fingerprint, snapshots, output_fields, results)
+        if isinstance(error, ValueError):
+            messagebox.showerror("Query Error", f"Invalid condition logic: {error}", parent=self)
+        elif error is not None:
+            messagebox.showerror("Execution Error", f"An error occurred: {error}", parent=self)
+
+    def _export_query(self):
+        """Runs the designer's query (the SQL view's when that tab is open) straight into a CSV or JSONL file."""
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=".csv", filetypes=[("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl")],
+            parent=self)
+        if not filepath:
+            return
+        if self.config_notebook.tab(self.config_notebook.select(), "text") == "SQL View":
+            self._run_sql_from_view(filepath)
+        else:
+            self._run_designer_query(filepath)
+
+    def _start_export(self, filepath, columns, value_rows):
+        """Streams value_rows into filepath on a worker thread, one batch at a time."""
+        run = {"cancel": self._query_cancel_event, "done": False, "error": None, "written": 0}
+        self._query_run = run
+        file_format = "jsonl" if filepath.lower().endswith((".jsonl", ".ndjson")) else "csv"
+        delimiter = self.app.csv_delimiter if hasattr(self.app, 'csv_delimiter') else ','
+        self.results_status_label.config(text="Exporting query...")
+        self.cancel_query_button.config(state="normal")
+        threading.Thread(target=self._export_worker, args=(run, filepath, file_format, delimiter, columns, value_rows),
+                         daemon=True).start()
+        self.after(QUERY_PUBLISH_INTERVAL_MS, self._publish_export_progress, run, filepath)
+
+    def _export_worker(self, run, filepath, file_format, delimiter, columns, value_rows):
+        # Like _query_worker, never touches Tk: _publish_export_progress polls run["written"].
+        try:
+            with open(filepath, 'w', newline='', encoding='utf-8', buffering=QUERY_EXPORT_BUFFER_BYTES) as f:
+                if file_format == "jsonl":
+                    for values in value_rows:
+                        f.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+                        f.write("\n")
+                        run["written"] += 1
+                else:
+                    writer = csv.writer(f, delimiter=delimiter)
+                    writer.writerow(columns)
+                    while True:
+                        batch = list(islice(value_rows, QUERY_EXPORT_BATCH_ROWS))
+                        if not batch:
+                            break
+                        writer.writerows(batch)
+                        run["written"] += len(batch)
+        except QueryCancelled:
+            pass
+        except ValueError as e:
+            run["error"] = e
+        except Exception as ex:
+            run["error"] = ex
+            traceback.print_exc()
+        run["done"] = True
 
-                func, field_to_agg = match.groups()
+    def _publish_export_progress(self, run, filepath):
+        if run is not self._query_run:
+            return
+        if not self.winfo_exists():
+            run["cancel"].set()
+            return
+        written = run["written"]
+        if not run["done"]:
+            self.results_status_label.config(text=f"Exporting query... {written:,} rows written.")
+            self.after(QUERY_PUBLISH_INTERVAL_MS, self._publish_export_progress, run, filepath)
+            return
 
-                values_to_agg = [row.get(field_to_agg, 0) for row in rows]
+        self._query_run = None
+        self.cancel_query_button.config(state="disabled")
+        error = run["error"]
+        if isinstance(error, ValueError):
+            self.results_status_label.config(text="Export failed.")
+            messagebox.showerror("Query Error", f"Invalid condition logic: {error}", parent=self)
+        elif error is not None:
+            self.results_status_label.config(text="Export failed.")
+            messagebox.showerror("Export Failed", f"An error occurred during export:\n{error}", parent=self)
+        elif run["cancel"].is_set():
+            self.results_status_label.config(
+                text=f"Export cancelled after {written:,} rows; {os.path.basename(filepath)} is incomplete.")
+        else:
+            self.results_status_label.config(text=f"Exported {written:,} rows.")
+            messagebox.showinfo("Success", f"Exported {written:,} rows to:\n{filepath}", parent=self)
 
-                numeric_values = []
-                for v in values_to_agg:
-                    try:
-                        numeric_values.append(float(v))
-                    except (ValueError, TypeError):
-                        continue
+    def _explain_query(self, analyze):
+        self._run_sql_from_view(explain="ANALYZE" if analyze else "EXPLAIN")
 
-                if func.upper() == "COUNT":
-                    agg_row[out_field] = len(values_to_agg)
-                elif func.upper() == "SUM":
-                    agg_row[out_field] = sum(numeric_values)
-                elif func.upper() == "AVG":
-                    agg_row[out_field] = sum(numeric_values) / len(numeric_values) if numeric_values else 0
-                elif func.upper() == "MIN":
-                    agg_row[out_field] = min(numeric_values) if numeric_values else ""
-                elif func.upper() == "MAX":
-                    agg_row[out_field] = max(numeric_values) if numeric_values else ""
+    def _new_query_plan(self, explain):
+        """Starts the QueryPlan for an EXPLAIN ("EXPLAIN" or "ANALYZE"), or returns None for a normal run."""
+        if not explain:
+            return None
+        return QueryPlan(self.query_view_text.get("1.0", tk.END), analyze=explain == "ANALYZE",
+                         trace_memory=self.plan_trace_memory_var.get())
+
+    def _explain_query_engine(self, plan, group_by_fields, output_fields, limit, order_by):
+        """Adds the steps _run_query_engine runs after the filter/join to plan, returned by stage name."""
+        operators = {}
+        if group_by_fields:
+            aggregates = [field for field in output_fields if field not in group_by_fields]
+            operators["aggregate"] = plan.add("Hash Aggregate", "group by " + ", ".join(group_by_fields),
+                                              notes=["Aggregates: " + ", ".join(aggregates)] if aggregates else ())
+        order_text = ", ".join(f"{field} {direction}" for field, direction in order_by)
+        if order_by and limit != -1:
+            operators["order"] = plan.add("Top-K", f"{limit:,} rows by {order_text}",
+                                          notes=["Bounded heap: only the best rows so far are kept."])
+        elif order_by:
+            operators["order"] = plan.add("Sort", order_text)
+        elif limit != -1:
+            operators["limit"] = plan.add(
+                "Limit", f"{limit:,} rows",
+                notes=() if group_by_fields else ["Stops reading the input once reached."])
+        if not group_by_fields:
+            operators["project"] = plan.add("Project", ", ".join(output_fields))
+        return operators
+
+    def _explain_join_pair(self, plan, table_names, tables, join_conditions, query_type, condition_tree):
+        """Adds a two-table join, as _join_row_pairs will run it (see _plan_join_pair), to plan."""
+        join_plan = self._plan_join_pair(tables[0], tables[1], join_conditions, query_type, condition_tree)
+        t1_conditions, t2_conditions, pair_conditions = join_plan["conditions"]
+        estimated_rows1, estimated_rows2 = join_plan["estimated_rows"]
+        strategy = join_plan["strategy"]
+        if query_type == "ANTI" and condition_tree:
+            t1_conditions = [condition_tree]  # The whole WHERE, with conditions on T2 false
+        sides = []
+        for n, conditions, estimated_rows in ((1, t1_conditions, estimated_rows1), (2, t2_conditions, estimated_rows2)):
+            # T2 is only scanned row by row when it is not read through its hash index.
+            source = f"T{n}" if n == 1 or strategy != "t2_index" else None
+            side = PlanOperator("Scan", f"T{n} '{table_names[n - 1]}'", estimated_rows=len(tables[n - 1]),
+                                source=source)
+            if conditions:
+                # An ANTI join's T1 filter is compiled on T1 alone, as _plan_join_pair does.
+                condition_tables = tables[:1] if n == 1 and query_type == "ANTI" else tables
+                condition_node = conditions[0] if len(conditions) == 1 else {'group': 'AND', 'conditions': conditions}
+                description, _ = self._describe_conditions(condition_node, *condition_tables)
+                side = PlanOperator("Filter", description, [side], estimated_rows,
+                                    notes=[f"Applied to T{n} rows before they are joined."])
+            sides.append(side)
+
+        on_text = " AND ".join(f"T1.{t1_field} = T2.{t2_field}" for t1_field, t2_field in join_conditions)
+        if strategy == "grace":
+            name = "Grace Hash Join"
+            notes = [f"The smaller side's hash index (about {min(estimated_rows1, estimated_rows2):,.0f} rows) "
+                     f"exceeds the {join_plan['memory_budget'] // 1048576:,} MB join memory budget: both sides are "
+                     f"spilled to {join_plan['partition_count']} partition files joined one at a time, building "
+                     f"on T{2 if join_plan['build_on_t2'] else 1}'s records in each."]
+        else:
+            name = "Hash Join"
+            notes = [{
+                "filtered_t2_index": "Build: hash index of the T2 rows passing their conditions; probe: T1 rows "
+                                     "streamed in order.",
+                "t2_index": "Build: hash index on T2 ("
+                            + ("cached on the table" if join_plan["index2"] is not None else
+                               "built from every row, then cached on the table")
+                            + "); probe: T1 rows streamed in order.",
+                "t1_candidates": "Build: the T1 rows passing their conditions (the smaller side); probe: T2 rows "
+                                 "streamed past them.",
+            }[strategy]]
+        if query_type == "FULL":
+            notes.append("T2 rows without a match are added after the T1 rows.")
+        if pair_conditions:
+            description, _ = self._describe_conditions({'group': 'AND', 'conditions': pair_conditions}, *tables)
+            notes.append(f"Join filter: {description}")
+        return plan.add(name, f"{query_type} on {on_text}", notes=notes, inputs=sides)
+
+    def _explain_chain_join(self, plan, table_names, tables, join_steps, condition_tree):
+        """Adds a join over three or more tables, as _chain_join_rows will run it, to plan."""
+        pushed_conditions, remaining_conditions = self._chain_join_pushdown(len(tables), join_steps, condition_tree)
+
+        def table_side(n, source):
+            side = PlanOperator("Scan", f"T{n} '{table_names[n - 1]}'", estimated_rows=len(tables[n - 1]),
+                                source=source)
+            conditions = pushed_conditions.get(f"T{n}")
+            if conditions:
+                description, pass_rate = self._describe_conditions({'group': 'AND', 'conditions': conditions},
+                                                                   *tables)
+                side = PlanOperator("Filter", description, [side], len(tables[n - 1]) * pass_rate,
+                                    notes=[f"Applied to T{n} rows before they are joined."])
+            return side
+
+        joined = table_side(1, "T1")
+        for n, step in enumerate(join_steps, 2):
+            fields = [field for _, _, field in step["conditions"]]
+            cached = tables[n - 1].hash_index(fields, build=False) is not None
+            on_text = " AND ".join(f"{alias}.{field} = T{n}.{step_field}"
+                                   for alias, field, step_field in step["conditions"])
+            joined = PlanOperator(
+                "Hash Join", f"{step['query_type']} on {on_text}", [joined, table_side(n, None)],
+                notes=[f"Build: hash index on T{n} ({'cached on the table' if cached else 'built, then cached'}); "
+                       f"probe: the rows joined so far."])
+        plan.root = joined
+        if remaining_conditions:
+            description, _ = self._describe_conditions({'group': 'AND', 'conditions': remaining_conditions},
+                                                       *tables, nullable=True)
+            plan.add("Filter", description, notes=["Conditions checked on the joined rows."])
+        return plan.root
+
+    def _show_query_plan(self, plan, items):
+        """Shows an EXPLAIN plan at once; for ANALYZE, first drains items through it on a worker thread."""
+        if not plan.analyze:
+            self._display_query_plan(plan)
+            return
+        run = {"cancel": self._query_cancel_event, "done": False, "error": None}
+        self._query_run = run
+        self.results_status_label.config(text="Analyzing query...")
+        self.cancel_query_button.config(state="normal")
+        threading.Thread(target=self._analyze_worker, args=(run, plan, items), daemon=True).start()
+        self.after(QUERY_PUBLISH_INTERVAL_MS, self._publish_query_plan, run, plan)
+
+    def _analyze_worker(self, run, plan, items):
+        # Like _query_worker, never touches Tk; tracemalloc is only stopped again if it was off before.
+        started_tracing = plan.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            plan.run(items)
+        except QueryCancelled:
+            pass
+        except ValueError as e:
+            run["error"] = e
+        except Exception as ex:
+            run["error"] = ex
+            traceback.print_exc()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        run["done"] = True
 
-            aggregated_results.append(agg_row)
+    def _publish_query_plan(self, run, plan):
+        if run is not self._query_run:
+            return
+        if not self.winfo_exists():
+            run["cancel"].set()
+            return
+        if not run["done"]:
+            self.results_status_label.config(text=f"Analyzing query... {plan.result_rows:,} rows so far.")
+            self.after(QUERY_PUBLISH_INTERVAL_MS, self._publish_query_plan, run, plan)
+            return
 
-        limit = self.limit_value_var.get() if self.limit_enabled_var.get() else -1
+        self._query_run = None
+        self.cancel_query_button.config(state="disabled")
+        plan.cancelled = run["cancel"].is_set()
+        error = run["error"]
+        if isinstance(error, ValueError):
+            self.results_status_label.config(text="Analyze failed.")
+            messagebox.showerror("Query Error", f"Invalid condition logic: {error}", parent=self)
+        elif error is not None:
+            self.results_status_label.config(text="Analyze failed.")
+            messagebox.showerror("Execution Error", f"An error occurred: {error}", parent=self)
+        else:
+            self.results_status_label.config(text=f"Analyzed query: {plan.result_rows:,} rows.")
+            self._display_query_plan(plan)
+
+    def _display_query_plan(self, plan):
+        self.query_plan_text.config(state="normal")
+        self.query_plan_text.delete("1.0", tk.END)
+        self.query_plan_text.insert("1.0", "\n".join(plan.lines()))
+        self.query_plan_text.config(state="disabled")
+        self.config_notebook.select(self.query_plan_frame)
+
+    def _cancel_query(self):
+        if self._query_run is not None:
+            self._query_run["cancel"].set()
+            self.results_status_label.config(text="Cancelling query...")
+
+    def _order_rows(self, rows, rank_readers, limit):
+        """Sorts rows by rank_readers, keeping ties in order; with a LIMIT only the best rows are kept, on a heap."""
+        if len(rank_readers) == 1:
+            # nlargest and reverse sorts keep ties in stream order too, and need no per-row negating key.
+            key, direction = rank_readers[0]
+            descending = direction == "DESC"
+        else:
+            signed_readers = [(rank, -1 if direction == "DESC" else 1) for rank, direction in rank_readers]
+            key = lambda row: tuple([sign * rank(row) for rank, sign in signed_readers])
+            descending = False
         if limit != -1:
-            return aggregated_results[:limit]
+            return (heapq.nlargest if descending else heapq.nsmallest)(limit, rows, key=key)
+        return sorted(rows, key=key, reverse=descending)
+
+    def _aggregate_rows(self, rows, read_field, group_by_fields, output_fields):
+        """Hash aggregation keeping one accumulator per field and kind, shared by every function that needs it."""
+        aggregates = []
+        for out_field in output_fields:
+            if out_field in group_by_fields:
+                continue
+            match = re.match(r"(\w+)\((.+)\)", out_field)
+            aggregates.append((out_field, match.group(1).upper(), match.group(2)) if match else (out_field, None, None))
+        accumulator_specs = list(dict.fromkeys((field, AGGREGATE_FUNCTIONS[func]) for _, func, field in aggregates
+                                               if func in AGGREGATE_FUNCTIONS))
+        key_readers = [read_field(field) for field in group_by_fields]
+        value_readers = [read_field(field, form) for field, (_, form) in accumulator_specs]
+        accumulator_classes = [accumulator_class for _, (accumulator_class, _) in accumulator_specs]
+
+        groups = {}
+        for row in rows:
+            key = tuple([read(row) for read in key_readers])
+            accumulators = groups.get(key)
+            if accumulators is None:
+                accumulators = groups[key] = [accumulator_class() for accumulator_class in accumulator_classes]
+            for accumulator, read in zip(accumulators, value_readers):
+                accumulator.add(read(row))
+
+        positions = {spec: i for i, spec in enumerate(accumulator_specs)}
+        aggregated_results = []
+        for key, accumulators in groups.items():
+            agg_row = dict(zip(group_by_fields, key))
+            for out_field, func, field in aggregates:
+                if out_field in agg_row:
+                    continue
+                if func is None:
+                    agg_row[out_field] = "N/A (Non-aggregated field in GROUP BY query)"
+                    continue
+                if func not in AGGREGATE_FUNCTIONS:
+                    continue
+                value = accumulators[positions[(field, AGGREGATE_FUNCTIONS[func])]].result(func)
+                if value is not None:
+                    agg_row[out_field] = value
+            aggregated_results.append(agg_row)
         return aggregated_results
 
+    def _row_field_reader(self, tables, single_table=False):
+        """Returns read(field, form="text") giving a reader for a "T<n>: column" field of one row."""
+        def read(field, form="text"):
+            alias, _, column = field.partition(": ")
+            missing = _NAN if form == "number" else -math.inf if form == "order" else ""
+            if not re.fullmatch(r"T\d+", alias) or not 1 <= int(alias[1:]) <= len(tables):
+                return lambda row: missing
+            values = tables[int(alias[1:]) - 1].column_values(column, form)
+            if single_table:
+                return values.__getitem__
+            position = int(alias[1:]) - 1
+            return lambda rows: values[rows[position]] if rows[position] >= 0 else missing
+        return read
+
     def _remove_all_output_fields(self):
         all_items = self.selected_fields_lb.get(0, tk.END)
         for item in all_items: self.available_fields_lb.insert(tk.END, item)
@@ -2527,6 +4993,18 @@ class QueryDesigner(tk.Toplevel):
             self.selected_fields_lb.selection_set(i + direction)
         self._update_query_view()
 
+    def _refresh_order_by_choices(self):
+        # Grouped results can only be ordered by their group and aggregate columns.
+        if self.grouped_by_lb.size():
+            fields = list(self.grouped_by_lb.get(0, tk.END))
+            fields += [field for field in self.selected_fields_lb.get(0, tk.END) if re.match(r"\w+\(.+\)", field)]
+        else:
+            fields = list(self.selected_fields_lb.get(0, tk.END)) + list(self.available_fields_lb.get(0, tk.END))
+            if self.table2_var.get() and self.query_type_var.get() != "ANTI":
+                fields.append("Match_Count")
+        fields = list(dict.fromkeys(fields))
+        self.order_by_combo['values'] = fields + [f"{field} DESC" for field in fields]
+
     def _toggle_limit_entry(self):
         state = "normal" if self.limit_enabled_var.get() else "disabled"
         self.limit_spinbox.config(state=state)
@@ -2536,8 +5014,11 @@ class QueryDesigner(tk.Toplevel):
         query_text = self.query_view_text.get("1.0", tk.END)
         config = None
         try:
-            if re.search(r"\s+(INNER|LEFT\s+ANTI)(?:\s+JOIN)?\s+", query_text, re.I):
+            if self._is_join_query(query_text):
                 config = self._parse_join_query(query_text)
+                if len(config["joins"]) > 1:
+                    raise ValueError("The visual designer joins two tables; run queries over more tables "
+                                     "from the SQL view.")
             elif re.search(r"\s+FROM\s+", query_text, re.I):
                 config = self._parse_filter_query(query_text)
             else:
@@ -2548,6 +5029,7 @@ class QueryDesigner(tk.Toplevel):
             self._on_table_select()
 
             if config.get("mode") == "join":
+                self.query_type_var.set(config["query_type"])
                 for t1_field, t2_field in config.get("join_conditions", []):
                     self.condition_type_var.set("join")
                     self.field1_var.set(t1_field)
@@ -2578,6 +5060,12 @@ class QueryDesigner(tk.Toplevel):
                     self.available_fields_lb.delete(idx)
                 except ValueError:
                     pass
+            for field in config.get("group_by_fields", []):
+                available_group_fields = list(self.group_available_lb.get(0, tk.END))
+                if field in available_group_fields:
+                    self.grouped_by_lb.insert(tk.END, field)
+                    self.group_available_lb.delete(available_group_fields.index(field))
+            self.order_by_var.set(", ".join(f"{field} {direction}" for field, direction in config.get("order_by", [])))
             self._validate_and_highlight_conditions()
             messagebox.showinfo("Success", "Manual query applied to the designer.", parent=self)
             self._update_query_view()
@@ -2587,48 +5075,89 @@ class QueryDesigner(tk.Toplevel):
             error_details = f"An unexpected error occurred:\n\n{traceback.format_exc()}"
             messagebox.showerror("Unexpected Error", error_details, parent=self)
 
+    @staticmethod
+    def _is_join_query(text):
+        """True if the FROM table is followed by a join. Quoted names and values are blanked first."""
+        unquoted = re.sub(r"'[^']*'", "''", text)
+        return re.search(r"\bFROM\s+''\s+AS\s+T1\s+(?:INNER|LEFT|FULL)\b", unquoted, re.I) is not None
+
     def _parse_join_query(self, text):
         select_match = re.search(r"SELECT\s*(.*?)\s*FROM", text, re.S | re.I)
         if not select_match: raise ValueError("Could not find SELECT clause.")
         fields_str = select_match.group(1).strip()
         output_fields = [f.strip() for f in re.split(r'\s*,\s*', fields_str) if f.strip()]
 
-        from_join_match = re.search(
-            r"FROM\s+'([^']+)'\s+AS\s+(T1)\s+(INNER(?:\s+JOIN)?|LEFT\s+ANTI(?:-JOIN)?)\s+'([^']+)'\s+AS\s+(T2)", text,
-            re.I | re.S)
-        if not from_join_match: raise ValueError("Could not parse FROM/JOIN clause.")
-        t1, a1, join_type_raw, t2, a2 = from_join_match.groups()
-        if a1.upper() != "T1" or a2.upper() != "T2": raise ValueError("Must use aliases T1 and T2.")
-        join_type = "ANTI" if "ANTI" in join_type_raw.upper() else "INNER"
-
-        on_match = re.search(r"\s+ON\s+(.*?)(?=\s*(?:WHERE|LIMIT|;|$))", text, re.S | re.I)
-        if not on_match: raise ValueError("Could not find ON clause.")
-        conditions_str = on_match.group(1).strip()
-        join_conditions = []
-        for part in re.split(r"\s+AND\s+", conditions_str, flags=re.I):
-            match = re.fullmatch(r"T1\.([\w\.\s-]+)\s*=\s*T2\.([\w\.\s-]+)", part.strip(), re.I)
-            if not match: raise ValueError(f"Invalid join condition: '{part}'")
-            join_conditions.append([f.strip() for f in match.groups()])
+        from_match = re.search(r"FROM\s+'([^']+)'\s+AS\s+(T1)\b", text, re.I | re.S)
+        if not from_match: raise ValueError("Could not parse FROM/JOIN clause.")
+        t1 = from_match.group(1)
+
+        join_steps = []
+        join_pattern = (fr"({self._JOIN_TYPE_PATTERN})\s+'([^']+)'\s+AS\s+(T\d+)\s+ON\s+(.*?)"
+                        r"(?=\s+(?:INNER|LEFT|FULL|WHERE|GROUP|ORDER|LIMIT)\b|\s*;|\s*$)")
+        for n, join_match in enumerate(re.finditer(join_pattern, text[from_match.end():], re.I | re.S), 2):
+            join_type_raw, table_name, alias, conditions_str = join_match.groups()
+            if alias.upper() != f"T{n}":
+                raise ValueError(f"Joined tables must use aliases T2, T3, ... in order (found {alias}).")
+            join_conditions = []
+            for part in re.split(r"\s+AND\s+", conditions_str.strip(), flags=re.I):
+                match = re.fullmatch(r"(T\d+)\.([@\w\.\s-]+?)\s*=\s*(T\d+)\.([@\w\.\s-]+)", part.strip(), re.I)
+                if not match: raise ValueError(f"Invalid join condition: '{part}'")
+                left_alias, left_field, right_alias, right_field = match.groups()
+                if left_alias.upper() == f"T{n}":
+                    left_alias, left_field, right_alias, right_field = right_alias, right_field, left_alias, left_field
+                if right_alias.upper() != f"T{n}" or not 1 <= int(left_alias[1:]) < n:
+                    raise ValueError(f"Join condition '{part}' must link T{n} to an earlier table.")
+                join_conditions.append([left_alias.upper(), left_field.strip(), right_field.strip()])
+            join_type = join_type_raw.upper()
+            if "ANTI" in join_type:
+                query_type = "ANTI"
+            elif join_type.startswith(("LEFT", "FULL")):
+                query_type = join_type[:4]
+            else:
+                query_type = "INNER"
+            join_steps.append({"table": table_name, "query_type": query_type, "conditions": join_conditions})
+        if not join_steps: raise ValueError("Could not parse FROM/JOIN clause.")
 
-        where_match = re.search(r"\s+WHERE\s+(.*?)(?=\s*(?:LIMIT|;|$))", text, re.S | re.I)
+        where_match = re.search(r"\s+WHERE\s+(.*?)(?=\s*(?:GROUP\s+BY|ORDER\s+BY|LIMIT|;|$))", text, re.S | re.I)
         filter_conditions = []
         if where_match:
             conditions_str = where_match.group(1).strip()
             op_pattern = r"CONTAINS|NOT\s*CONTAINS|STARTS\s*WITH|ENDS\s*WITH|[<>=!]+"
             for part in re.split(r"\s+AND\s+", conditions_str, flags=re.I):
-                match = re.match(fr"(T1|T2)\.([\w\.\s-]+)\s+({op_pattern})\s+'([^']*)'", part.strip(), re.I)
+                match = re.match(fr"(T\d+)\.([@\w\.\s-]+)\s+({op_pattern})\s+'([^']*)'", part.strip(), re.I)
                 if not match: continue
                 alias, field, op, value = match.groups()
                 filter_conditions.append((alias.upper(), field.strip(), op.upper().replace(" ", ""), value))
 
         limit_match = re.search(r"LIMIT\s*(\d+)", text, re.I)
         return {
-            "mode": "join", "table1": t1, "table2": t2, "join_conditions": join_conditions,
-            "filter_conditions": filter_conditions,
-            "output_fields": output_fields, "query_type": join_type,
+            "mode": "join", "table1": t1, "table2": join_steps[0]["table"],
+            "join_conditions": [[left_field, right_field] for _, left_field, right_field in join_steps[0]["conditions"]],
+            "joins": join_steps, "filter_conditions": filter_conditions,
+            "output_fields": output_fields, "query_type": join_steps[0]["query_type"],
+            "group_by_fields": self._parse_group_by(text), "order_by": self._parse_order_by(text),
             "limit_enabled": bool(limit_match), "limit_value": int(limit_match.group(1)) if limit_match else 100
         }
 
+    def _parse_group_by(self, text):
+        group_match = re.search(r"\s+GROUP\s+BY\s+(.*?)(?=\s*(?:ORDER\s+BY|LIMIT|;|$))", text, re.S | re.I)
+        if not group_match:
+            return []
+        return [f.strip() for f in re.split(r'\s*,\s*', group_match.group(1).strip()) if f.strip()]
+
+    def _parse_order_by(self, text):
+        order_match = re.search(r"\s+ORDER\s+BY\s+(.*?)(?=\s*(?:LIMIT|;|$))", text, re.S | re.I)
+        return self._parse_order_by_list(order_match.group(1)) if order_match else []
+
+    def _parse_order_by_list(self, text):
+        """Reads 'field [ASC|DESC], ...' into a list of [field, "ASC" | "DESC"]."""
+        order_by = []
+        for part in re.split(r'\s*,\s*', text.strip()):
+            match = re.fullmatch(r"(.+?)(?:\s+(ASC|DESC))?", part.strip(), re.S | re.I)
+            if match and match.group(1).strip():
+                order_by.append([match.group(1).strip(), (match.group(2) or "ASC").upper()])
+        return order_by
+
     def _parse_filter_query(self, text):
         select_match = re.search(r"SELECT\s*(.*?)\s*FROM", text, re.S | re.I)
         if not select_match: raise ValueError("Could not find SELECT clause.")
@@ -2640,13 +5169,13 @@ class QueryDesigner(tk.Toplevel):
         t1, alias = from_match.groups()
         if alias and alias.upper() != "T1": raise ValueError("Alias for single table must be T1 if provided.")
 
-        where_match = re.search(r"\s+WHERE\s+(.*?)(?=\s*(?:LIMIT|;|$))", text, re.S | re.I)
+        where_match = re.search(r"\s+WHERE\s+(.*?)(?=\s*(?:GROUP\s+BY|ORDER\s+BY|LIMIT|;|$))", text, re.S | re.I)
         filter_conditions = []
         if where_match:
             conditions_str = where_match.group(1).strip()
             op_pattern = r"CONTAINS|NOT\s*CONTAINS|STARTS\s*WITH|ENDS\s*WITH|[<>=!]+"
             for part in re.split(r"\s+AND\s+", conditions_str, flags=re.I):
-                match = re.match(fr"(?:T1\.)?([\w\.\s-]+)\s+({op_pattern})\s+'([^']*)'", part.strip(), re.I)
+                match = re.match(fr"(?:T1\.)?([@\w\.\s-]+)\s+({op_pattern})\s+'([^']*)'", part.strip(), re.I)
                 if not match: continue
                 field, op, value = match.groups()
                 filter_conditions.append(("T1", field.strip(), op.upper().replace(" ", ""), value))
@@ -2654,12 +5183,13 @@ class QueryDesigner(tk.Toplevel):
         limit_match = re.search(r"LIMIT\s*(\d+)", text, re.I)
         return {
             "mode": "filter", "table1": t1, "table2": "", "filter_conditions": filter_conditions,
-            "output_fields": output_fields,
+            "output_fields": output_fields, "group_by_fields": self._parse_group_by(text),
+            "order_by": self._parse_order_by(text),
             "limit_enabled": bool(limit_match), "limit_value": int(limit_match.group(1)) if limit_match else 100
         }
 
     def _export_results(self):
-        if not self.results_tree.get_children():
+        if not self.results_view_rows:
             messagebox.showwarning("Export Error", "There are no results to export.", parent=self)
             return
         filepath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")],
@@ -2669,40 +5199,39 @@ class QueryDesigner(tk.Toplevel):
             delimiter = self.app.csv_delimiter if hasattr(self.app, 'csv_delimiter') else ','
             with open(filepath, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f, delimiter=delimiter)
-                writer.writerow(self.results_tree["columns"])
-                for item_id in self.results_tree.get_children():
-                    writer.writerow(self.results_tree.item(item_id, "values"))
+                writer.writerow(self.results_columns)
+                for view_index in range(len(self.results_view_rows)):
+                    writer.writerow(self._results_row_values(view_index))
             messagebox.showinfo("Success", "Results exported successfully.", parent=self)
         except Exception as e:
             messagebox.showerror("Export Failed", f"An error occurred during export:\n{e}", parent=self)
 
     def _get_rows_from_source(self, table_name):
+        # Queries run on the app's materialized tables (shared with the table tabs), never on the element tree.
         key = self.table_combobox_map[table_name]
-        if self.file_type == 'xml':
-            table_info = self.potential_tables[key]
-            return table_info["parent_element"].findall(table_info["row_tag"])
-        elif self.file_type == 'csv':
-            return self.table_data_cache.get(key, [])
-        return []
-
-    def _get_cell_value(self, row, column):
-        if self.file_type == 'xml':
-            return row.findtext(column, "").strip()
-        elif self.file_type == 'csv':
-            return row.get(column, "").strip()
-        return ""
+        table = self.app.get_table_data(key)
+        return table if table is not None else ColumnarTable()
 
     def _get_all_columns(self, table_name):
         key = self.table_combobox_map[table_name]
         return self.potential_tables[key]['columns']
 
     def _on_results_click(self, event):
-        if self.results_tree.identify("region", event.x, event.y) == "heading":
+        region = self.results_tree.identify("region", event.x, event.y)
+        if region == "heading":
             col_id_str = self.results_tree.identify_column(event.x)
             col_id = self.results_tree.column(col_id_str, "id")
             self._sort_by_column(col_id)
+        elif region == "cell":
+            item_id = self.results_tree.identify_row(event.y)
+            tags = self.results_tree.item(item_id, "tags") if item_id else None
+            if tags:
+                self._select_results_row(int(tags[0]))
+                self.results_tree.focus_set()
 
     def _sort_by_column(self, col_name):
+        if self._query_run is not None:
+            return  # Rows are still arriving; the grid sorts once the query has finished
         if self.results_sort_col == col_name:
             self.results_sort_asc = not self.results_sort_asc
         else:
@@ -2713,29 +5242,10 @@ class QueryDesigner(tk.Toplevel):
         tree = self.results_tree
         if not tree["columns"]: return
         try:
-            items_to_sample = tree.get_children()[:VIRTUAL_TABLE_ROW_COUNT]
-
-            style = ttk.Style()
-            font_name = style.lookup("Treeview", "font") or "TkDefaultFont"
-            tree_font = tkFont.Font(font=font_name)
-            padding = 20
-
-            for col_id in tree["columns"]:
-                header_text = tree.heading(col_id, "text").split(" ")[0]
-                max_width = tree_font.measure(header_text) + padding
-
-                col_index = tree["columns"].index(col_id)
-                for item_id in items_to_sample:
-                    values = tree.item(item_id, "values")
-                    try:
-                        cell_value = str(values[col_index]) if values and col_index < len(values) else ""
-                        cell_width = tree_font.measure(cell_value) + padding
-                        if cell_width > max_width: max_width = cell_width
-                    except (ValueError, IndexError):
-                        continue
-
-                max_width = min(max(max_width, 50), 500)
-                tree.column(col_id, width=max_width, stretch=False)
+            # Sample across all results rather than the visible window.
+            sample_rows = [self._results_row_values(position)
+                           for position in percentile_positions(len(self.results_view_rows))]
+            autosize_columns(tree, sample_rows)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to resize columns: {e}", parent=self)
 
@@ -2893,12 +5403,16 @@ class XMLNotepad:
          root.state('zoomed') #Fullscreen by default
         self.file_type = None
         self.xml_tree_root = None
+        self.table_candidates = []
         self.tree_item_to_element = {}
         self.selected_element_for_context_menu = None
         self.potential_tables = {}
         self.table_combobox_map = {}
         self.current_loaded_filepath = ""
+        self.xml_streaming_mode = False
         self.csv_delimiter = ','
+        self.join_memory_budget_mb = JOIN_MEMORY_BUDGET_MB
+        self.query_result_cache = QueryResultCache(QUERY_CACHE_BUDGET_MB * 1024 * 1024)
         self.undo_stack = deque(maxlen=UNDO_STACK_SIZE)
         self.redo_stack = deque(maxlen=UNDO_STACK_SIZE)
         self.table_data_cache = {}
@@ -2991,6 +5505,8 @@ class XMLNotepad:
 
         self.filemenu = tk.Menu(self.menubar, tearoff=0)
         self.filemenu.add_command(label="Open XML...", command=self.open_xml_file_threaded, accelerator="Ctrl+O")
+        self.filemenu.add_command(label="Open Large XML (Streaming)...",
+                                  command=lambda: self.open_xml_file_threaded(streaming=True))
         self.filemenu.add_command(label="Open CSV...", command=self.open_csv_file_threaded)
         self.filemenu.add_command(label="Close File", command=self.close_current_file, state="disabled")
         self.filemenu.add_separator()
@@ -3025,6 +5541,7 @@ class XMLNotepad:
         self.utilsmenu.add_command(label="Validate XML with XSD...", command=self._validate_with_xsd)
         self.utilsmenu.add_separator()
         self.utilsmenu.add_command(label="Set CSV Delimiter...", command=self._set_csv_delimiter)
+        self.utilsmenu.add_command(label="Set Join Memory Budget...", command=self._set_join_memory_budget)
         self.menubar.add_cascade(label="Utils", menu=self.utilsmenu)
 
         self.helpmenu = tk.Menu(self.menubar, tearoff=0)
@@ -3178,6 +5695,30 @@ class XMLNotepad:
         self.editmenu.entryconfig("Undo", state="normal")
         self.editmenu.entryconfig("Redo", state="disabled")
 
+    def get_table_data(self, internal_key):
+        """Returns the cached ColumnarTable for a table, materializing an XML table on first use (None if unknown)."""
+        table = self.table_data_cache.get(internal_key)
+        if table is None and self.file_type == 'xml':
+            table_info = self.potential_tables.get(internal_key)
+            if table_info and table_info.get("parent_element") is not None:
+                table = materialize_table(table_info["parent_element"], table_info["row_tag"], table_info["columns"])
+                self.table_data_cache[internal_key] = table
+        return table
+
+    def write_cell_to_element(self, row_data, column, value):
+        # Rows loaded in streaming mode (and CSV rows) have no backing element to update.
+        element = row_data.get("_element") if self.file_type == 'xml' else None
+        if element is None:
+            return
+        if column.startswith("@"):
+            element.set(column[1:], value)
+            return
+        col_data = element.find(column)
+        if col_data is not None:
+            col_data.text = value
+        else:
+            ET.SubElement(element, column).text = value
+
     def handle_ctrl_s(self, event=None):
         current_tab = self.get_current_table_tab()
         if current_tab:
@@ -3221,6 +5762,14 @@ class XMLNotepad:
         elif new_delimiter is not None:
             messagebox.showwarning("Invalid Input", "Delimiter must be a single character.", parent=self.root)
 
+    def _set_join_memory_budget(self):
+        new_budget = simpledialog.askinteger(
+            "Join Memory Budget", "Memory (MB) a query join may use for its index before spilling to disk:",
+            initialvalue=self.join_memory_budget_mb, minvalue=16, parent=self.root)
+        if new_budget is not None:
+            self.join_memory_budget_mb = new_budget
+            messagebox.showinfo("Success", f"Join memory budget has been set to {new_budget} MB.", parent=self.root)
+
     def _generate_xsd(self):
         if self.file_type != 'xml' or not self.current_loaded_filepath:
             messagebox.showerror("Error", "Please open an XML file first.", parent=self.root)
@@ -3370,6 +5919,7 @@ class XMLNotepad:
         self.update_status("Resetting UI...", show_progress=False)
         self.file_type = None
         self.current_loaded_filepath = ""
+        self.xml_streaming_mode = False
         self.filename_display_var.set("No file loaded.")
         self.selected_table_var.set('')
         self.tables_combobox.set('')
@@ -3385,10 +5935,12 @@ class XMLNotepad:
         self.content_notebook.select(0)
 
         self.xml_tree_root = None
+        self.table_candidates = []
         self.selected_element_for_context_menu = None
         self.undo_stack.clear()
         self.redo_stack.clear()
         self.table_data_cache.clear()
+        self.query_result_cache.clear()
 
         try:
             self.paned_window.sashpos(0, 300)
@@ -3410,18 +5962,29 @@ class XMLNotepad:
         self.utilsmenu.entryconfig("Transactional Data Check...", state="disabled")
         self.root.update_idletasks()
 
-    def open_xml_file_threaded(self):
+    def open_xml_file_threaded(self, streaming=False):
         filepath = filedialog.askopenfilename(title="Open XML File",
                                               filetypes=(("XML files", "*.xml"), ("All files", "*.*")),
                                               parent=self.root)
         if not filepath:
             return
+        if not streaming and os.path.getsize(filepath) >= LARGE_XML_FILE_SIZE:
+            size_mb = os.path.getsize(filepath) / (1024 * 1024)
+            streaming = messagebox.askyesno(
+                "Large File",
+                f"This file is {size_mb:,.0f} MB.\nLoad it in streaming mode?\n\n"
+                "Streaming mode only keeps the detected tables in memory. "
+                "The XML tree view and 'Save XML As...' are not available.",
+                parent=self.root)
         self._reset_ui_for_new_file()
         self.file_type = 'xml'
+        self.xml_streaming_mode = streaming
         self.current_loaded_filepath = filepath
         self.filemenu.entryconfig("Open XML...", state="disabled")
+        self.filemenu.entryconfig("Open Large XML (Streaming)...", state="disabled")
         self.filemenu.entryconfig("Open CSV...", state="disabled")
-        threading.Thread(target=self._parse_and_populate_worker, args=(filepath,), daemon=True).start()
+        worker = self._stream_parse_worker if streaming else self._parse_and_populate_worker
+        threading.Thread(target=worker, args=(filepath,), daemon=True).start()
 
     def open_csv_file_threaded(self):
         filepath = filedialog.askopenfilename(title="Open CSV File",
@@ -3433,6 +5996,7 @@ class XMLNotepad:
         self.file_type = 'csv'
         self.current_loaded_filepath = filepath
         self.filemenu.entryconfig("Open XML...", state="disabled")
+        self.filemenu.entryconfig("Open Large XML (Streaming)...", state="disabled")
         self.filemenu.entryconfig("Open CSV...", state="disabled")
         threading.Thread(target=self._parse_csv_and_populate_worker, args=(filepath,), daemon=True).start()
 
@@ -3457,6 +6021,8 @@ class XMLNotepad:
                         self.root.after(0, self.update_status,
                                         f"Parsing {os.path.basename(filepath)} ({int(progress)}%)...", True, progress)
             self.xml_tree_root = parser.close()
+            self.root.after(0, self.update_status, f"Finding tables in {os.path.basename(filepath)}...", True, 100)
+            self.table_candidates = find_table_candidates(self.xml_tree_root)
             self.root.after(0, self._finish_loading_success, filepath)
         except ET.ParseError as e:
             self.xml_tree_root = None
@@ -3467,6 +6033,104 @@ class XMLNotepad:
             self.root.after(0, self._finish_loading_error, f"{error_type}: {str(e)[:200]}")
         finally:
             self.root.after(0, lambda: self.filemenu.entryconfig("Open XML...", state="normal"))
+            self.root.after(0, lambda: self.filemenu.entryconfig("Open Large XML (Streaming)...", state="normal"))
+            self.root.after(0, lambda: self.filemenu.entryconfig("Open CSV...", state="normal"))
+
+    def _stream_parse_worker(self, filepath):
+        """Loads a large XML file with iterparse, keeping only the detected tables in memory."""
+        try:
+            total_size = os.path.getsize(filepath)
+            if total_size == 0:
+                self.root.after(0, self._finish_loading_error, "The selected XML file is empty.")
+                return
+            self.root.after(0, self.update_status, f"Streaming {os.path.basename(filepath)}...", True, 0)
+
+            # Each open element gets a frame: [element, child tag counts, rows per child tag, tables per child tag].
+            # Rows wait in the lists as dicts and move into the frame's tables every STREAM_ROW_BATCH_ROWS rows;
+            # the counts and row lists are only allocated once the element has a finished child.
+            open_frames = []
+            tag_path = []
+            table_rows = defaultdict(ColumnarTable)  # (parent path, row tag) -> rows kept so far
+            processed = 0
+
+            with open(filepath, 'rb') as f:
+                for event, element in ET.iterparse(f, events=("start", "end")):
+                    if event == "start":
+                        open_frames.append([element, None, None, None])
+                        tag_path.append(element.tag)
+                        continue
+
+                    element, tag_counts, child_rows, child_tables = open_frames.pop()
+                    tag_path.pop()
+
+                    # This element's children are complete: keep its rows if it looks like a table.
+                    row_tag = find_table_row_tag(tag_counts)
+                    batched = child_tables.get(row_tag) if child_tables and row_tag is not None else None
+                    if row_tag is not None and (batched is not None or child_rows.get(row_tag)):
+                        table_key = (tuple(tag_path) + (element.tag,), row_tag)
+                        table = table_rows.get(table_key)
+                        if table is None:
+                            table = table_rows[table_key] = batched if batched is not None else ColumnarTable()
+                        elif batched is not None:
+                            table.append_table(batched)
+                        for row_data in child_rows[row_tag]:
+                            table.append_row(row_data)
+
+                    if not open_frames:
+                        break
+
+                    parent_frame = open_frames[-1]
+                    if parent_frame[1] is None:
+                        parent_frame[1], parent_frame[2] = Counter(), defaultdict(list)
+                    parent_counts = parent_frame[1]
+                    parent_counts[element.tag] += 1
+
+                    if len(element) or element.attrib:
+                        row_data = {attribute_column(name): value.strip() for name, value in element.attrib.items()}
+                        for col_el in element:
+                            if col_el.tag not in row_data:
+                                row_data[col_el.tag] = col_el.text.strip() if col_el.text else ""
+                        pending_rows = parent_frame[2][element.tag]
+                        pending_rows.append(row_data)
+                        if len(pending_rows) >= STREAM_ROW_BATCH_ROWS:
+                            if parent_frame[3] is None:
+                                parent_frame[3] = defaultdict(ColumnarTable)
+                            batch_table = parent_frame[3][element.tag]
+                            for row_data in pending_rows:
+                                batch_table.append_row(row_data)
+                            pending_rows.clear()
+
+                    # Only the first child with a given tag can become a column of the parent's row.
+                    if len(element) or parent_counts[element.tag] > 1:
+                        element.clear()
+                        parent_frame[0].remove(element)
+
+                    processed += 1
+                    if processed % STREAM_PROGRESS_INTERVAL == 0:
+                        progress = (f.tell() / total_size) * 100
+                        self.root.after(0, self.update_status,
+                                        f"Streaming {os.path.basename(filepath)} ({int(progress)}%, "
+                                        f"{processed:,} elements)...", True, progress)
+
+            for (parent_path, row_tag), rows in table_rows.items():
+                parent_tag = parent_path[-1]
+                internal_key = f"{parent_tag}_rows_{row_tag}_path{'/'.join(parent_path)}"
+                self.potential_tables[internal_key] = {
+                    "parent_element": None, "row_tag": row_tag,
+                    "columns": sorted(rows.columns),
+                    "display_name_candidate": self._table_display_name(parent_tag, row_tag, parent_path[0]),
+                    "original_parent_tag": parent_tag
+                }
+                self.table_data_cache[internal_key] = rows
+            self.root.after(0, self._finish_loading_success, filepath)
+        except ET.ParseError as e:
+            self.root.after(0, self._finish_loading_error, f"XML Parse Error: {str(e)[:200]}")
+        except Exception as e:
+            error_type = type(e).__name__
+            self.root.after(0, self._finish_loading_error, f"{error_type}: {str(e)[:200]}")
+        finally:
+            self.root.after(0, lambda: self.filemenu.entryconfig("Open XML...", state="normal"))
+            self.root.after(0, lambda: self.filemenu.entryconfig("Open Large XML (Streaming)...", state="normal"))
             self.root.after(0, lambda: self.filemenu.entryconfig("Open CSV...", state="normal"))
 
     def _parse_csv_and_populate_worker(self, filepath):
@@ -3490,13 +6154,29 @@ class XMLNotepad:
 
                 reader = csv.reader(f, delimiter=self.csv_delimiter)
                 headers = next(reader)
-                data = []
+                data = ColumnarTable(headers)
+                # A repeated header name keeps its last column's values, as a dict built from the row would.
+                last_positions = {header: i for i, header in enumerate(headers)}
+                picks = [last_positions[column] for column in data.columns]
+                if picks == list(range(len(headers))):
+                    picks = None
+                batch = []
                 for row in reader:
-                    data.append({h: v for h, v in zip(headers, row)})
+                    if picks is not None:
+                        if len(row) >= len(headers):
+                            row = [row[i] for i in picks]
+                        else:
+                            values = dict(zip(headers, row))
+                            row = [values.get(column, "") for column in data.columns]
+                    batch.append(row)
+                    if len(batch) >= TABLE_BATCH_ROWS:
+                        data.extend_rows(batch)
+                        batch = []
+                data.extend_rows(batch)
 
             internal_key = os.path.basename(filepath)
             self.potential_tables[internal_key] = {
-                "columns": headers,
+                "columns": list(data.columns),
                 "display_name_candidate": internal_key
             }
             self.table_data_cache[internal_key] = data
@@ -3506,6 +6186,7 @@ class XMLNotepad:
             self.root.after(0, self._finish_loading_error, f"CSV Load Error: {str(e)[:200]}")
         finally:
             self.root.after(0, lambda: self.filemenu.entryconfig("Open XML...", state="normal"))
+            self.root.after(0, lambda: self.filemenu.entryconfig("Open Large XML (Streaming)...", state="normal"))
             self.root.after(0, lambda: self.filemenu.entryconfig("Open CSV...", state="normal"))
 
     def _finish_loading_success(self, loaded_filepath):
@@ -3514,12 +6195,19 @@ class XMLNotepad:
         self.editmenu.entryconfig("Find...", state="normal")
         self.filemenu.entryconfig("Close File", state="normal")
 
-        if self.file_type == 'xml':
+        if self.file_type == 'xml' and self.xml_streaming_mode:
+            # Tables were already extracted while streaming; there is no DOM to show or save.
+            self.tree_frame_outer.pack_forget()
+            try:
+                self.paned_window.sashpos(0, 0)
+            except tk.TclError:
+                pass
+            self.update_status("Processing streamed tables...", True, 90)
+        elif self.file_type == 'xml':
             self.filemenu.entryconfig("Save XML As...", state="normal")
             self.tree_frame_outer.pack(side=tk.TOP, expand=True, fill='both')
             self.update_status(f"Populating tree for {os.path.basename(loaded_filepath)}...", True, 50)
             self.populate_main_xml_treeview()
-            self.update_status("Discovering tables...", True, 85)
             self.discover_potential_tables()
         elif self.file_type == 'csv':
             self.tree_frame_outer.pack_forget()
@@ -3534,7 +6222,7 @@ class XMLNotepad:
         if self.potential_tables:
             self.utilsmenu.entryconfig("Query Designer...", state="normal")
             self.utilsmenu.entryconfig("Transactional Data Check...", state="normal")
-            if self.file_type == 'csv':
+            if self.file_type == 'csv' or self.xml_streaming_mode:
                 if self.tables_combobox['values']:
                     first_table = self.tables_combobox['values'][0]
                     self.selected_table_var.set(first_table)
@@ -3616,45 +6304,28 @@ class XMLNotepad:
         self.potential_tables.clear()
         if self.xml_tree_root is None:
             return
-        for parent_element in self.xml_tree_root.iter():
-            if len(parent_element) < MIN_ROWS_FOR_TABLE:
-                continue
-            child_tags = [child.tag for child in parent_element if child.tag is not None]
-            if not child_tags:
-                continue
-            tag_counts = Counter(child_tags)
-            if not tag_counts:
-                continue
-            most_common_tag, count = tag_counts.most_common(1)[0]
-            if count >= MIN_ROWS_FOR_TABLE and (count / len(parent_element)) >= MIN_PERCENT_SIMILAR:
-                row_elements = [child for child in parent_element if child.tag == most_common_tag]
-                if not row_elements:
-                    continue
-                column_headers = set()
-                for row_el in row_elements[:50]:
-                    for col_el in row_el:
-                        if col_el.tag is not None:
-                            column_headers.add(col_el.tag)
-                if column_headers:
-                    internal_key = f"{parent_element.tag}_rows_{most_common_tag}_id{id(parent_element)}"
-
-                    parent_tag_lower = parent_element.tag.lower()
-                    child_tag_lower = most_common_tag.lower()
-                    is_plural_of_child = parent_tag_lower.endswith('s') and parent_tag_lower.rstrip(
-                        's') == child_tag_lower
-
-                    if parent_tag_lower == child_tag_lower or is_plural_of_child:
-                        display_name_candidate = parent_element.tag.capitalize()
-                    elif parent_element.tag != self.xml_tree_root.tag:
-                        display_name_candidate = f"{parent_element.tag.capitalize()}/{most_common_tag.capitalize()}"
-                    else:
-                        display_name_candidate = most_common_tag.capitalize()
+        # Candidates were found by find_table_candidates on the loader thread.
+        for parent_element, row_tag, columns in self.table_candidates:
+            internal_key = f"{parent_element.tag}_rows_{row_tag}_id{id(parent_element)}"
+            display_name_candidate = self._table_display_name(parent_element.tag, row_tag, self.xml_tree_root.tag)
+
+            self.potential_tables[internal_key] = {
+                "parent_element": parent_element, "row_tag": row_tag,
+                "columns": columns, "display_name_candidate": display_name_candidate,
+                "original_parent_tag": parent_element.tag
+            }
+
+    @staticmethod
+    def _table_display_name(parent_tag, row_tag, root_tag):
+        parent_tag_lower = parent_tag.lower()
+        child_tag_lower = row_tag.lower()
+        is_plural_of_child = parent_tag_lower.endswith('s') and parent_tag_lower.rstrip('s') == child_tag_lower
 
-                    self.potential_tables[internal_key] = {
-                        "parent_element": parent_element, "row_tag": most_common_tag,
-                        "columns": sorted(list(column_headers)), "display_name_candidate": display_name_candidate,
-                        "original_parent_tag": parent_element.tag
-                    }
+        if parent_tag_lower == child_tag_lower or is_plural_of_child:
+            return parent_tag.capitalize()
+        elif parent_tag != root_tag:
+            return f"{parent_tag.capitalize()}/{row_tag.capitalize()}"
+        return row_tag.capitalize()
 
     def populate_table_combobox(self):
         self.tables_combobox.set('')
@@ -3826,9 +6497,7 @@ class XMLNotepad:
                 new_value = old_value.replace(search_var.get(), replace_var.get())
 
                 self.table_data_cache[internal_key][data_index][column] = new_value
-                if self.file_type == 'xml':
-                    element = self.table_data_cache[internal_key][data_index]['_element']
-                    element.find(column).text = new_value
+                self.write_cell_to_element(self.table_data_cache[internal_key][data_index], column, new_value)
 
                 self.push_undo({"action": "edit", "column": column, "old_value": old_value, "new_value": new_value,
                                 "internal_key": internal_key, "original_index": data_index})
@@ -3861,9 +6530,7 @@ class XMLNotepad:
                     if search_term in old_value:
                         new_value = old_value.replace(search_term, replace_term)
                         self.table_data_cache[internal_key][data_index][column] = new_value
-                        if self.file_type == 'xml':
-                            element = self.table_data_cache[internal_key][data_index]['_element']
-                            element.find(column).text = new_value
+                        self.write_cell_to_element(self.table_data_cache[internal_key][data_index], column, new_value)
                         changes.append({"original_index": data_index, "column": column, "old_value": old_value,
                                         "new_value": new_value})
 
@@ -4006,15 +6673,12 @@ class XMLNotepad:
         if action["action"] == "edit":
             original_index, column, old_value = action["original_index"], action["column"], action["old_value"]
             self.table_data_cache[internal_key][original_index][column] = old_value
-            if self.file_type == 'xml':
-                element = self.table_data_cache[internal_key][original_index]['_element']
-                element.find(column).text = old_value
+            self.write_cell_to_element(self.table_data_cache[internal_key][original_index], column, old_value)
         elif action["action"] == "batch_replace" or action["action"] == "batch_update":
             for change in action["changes"]:
                 original_index, column, old_value = change["original_index"], change["column"], change["old_value"]
                 self.table_data_cache[internal_key][original_index][column] = old_value
-                if self.file_type == 'xml':
-                    self.table_data_cache[internal_key][original_index]['_element'].find(column).text = old_value
+                self.write_cell_to_element(self.table_data_cache[internal_key][original_index], column, old_value)
         elif action["action"] == "batch_delete":
             parent_element = self.potential_tables[internal_key].get(
                 "parent_element") if self.file_type == 'xml' else None
@@ -4043,14 +6707,12 @@ class XMLNotepad:
         if action["action"] == "edit":
             original_index, column, new_value = action["original_index"], action["column"], action["new_value"]
             self.table_data_cache[internal_key][original_index][column] = new_value
-            if self.file_type == 'xml':
-                self.table_data_cache[internal_key][original_index]['_element'].find(column).text = new_value
+            self.write_cell_to_element(self.table_data_cache[internal_key][original_index], column, new_value)
         elif action["action"] == "batch_replace" or action["action"] == "batch_update":
             for change in action["changes"]:
                 original_index, column, new_value = change["original_index"], change["column"], change["new_value"]
                 self.table_data_cache[internal_key][original_index][column] = new_value
-                if self.file_type == 'xml':
-                    self.table_data_cache[internal_key][original_index]['_element'].find(column).text = new_value
+                self.write_cell_to_element(self.table_data_cache[internal_key][original_index], column, new_value)
         elif action["action"] == "batch_delete":
             for item in sorted(action["deleted_rows"], key=lambda x: x['index'], reverse=True):
                 self.table_data_cache[internal_key].pop(item['index'])